@@ -156,4 +156,14 @@ class ConfigException(BgsException):
     """
     def __init__(self, message, original_exception=None):
         super().__init__(message)
-        self.original_exception = original_exception
\ No newline at end of file
+        self.original_exception = original_exception
+
+
+class ShapefileTooComplexException(BgsException):
+    """
+    Raised when a shapefile has more vertices than can be converted
+    into h3 cells within a reasonable time
+    """
+    def __init__(self, message, original_exception=None):
+        super().__init__(message)
+        self.original_exception = original_exception
@@ -169,6 +169,8 @@ def show(parser: argparse.ArgumentParser):
                 args.day
             )
 
+    cliexec.close()
+
     end_time = time.time()
     diff = end_time - start_time
     logger.info(f"show commmand time taken: {diff} seconds")
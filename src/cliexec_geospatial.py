@@ -5,12 +5,16 @@
 # https://opensource.org/licenses/MIT.
 #
 # Created: 2024-03-08 by davis.broda@brodagroupsoftware.com
+import concurrent.futures
 import json
 import logging
 import os.path
+import threading
 from typing import List, Optional, Dict, Any, Tuple
 
-import pandas
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from geomesh import Geomesh
 from routers import geomesh_router
@@ -25,6 +29,15 @@ LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 logging.basicConfig(level=logging.INFO, format=LOGGING_FORMAT)
 logger = logging.getLogger(__name__)
 
+HTTP_POOL_CONNECTIONS = 8
+HTTP_POOL_MAXSIZE = 32
+HTTP_MAX_RETRIES = 3
+HTTP_RETRY_BACKOFF = 0.2
+
+# Maximum number of requests in flight at once when issuing many requests,
+# kept below the pool size so that connections are always reused
+MAX_CONCURRENT_REQUESTS = 16
+
 
 # Abstract class
 class CliExecGeospatial:
@@ -35,6 +48,48 @@ class CliExecGeospatial:
         self.host = config["host"]
         self.port = config["port"]
 
+        # A single connection pool is shared by all requests so that
+        # connections to the server are kept alive and reused instead of
+        # reopened per call. The pool is thread-safe, but a requests Session
+        # is not, so each thread gets its own session mounting the pool.
+        self._adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=Retry(
+                total=HTTP_MAX_RETRIES,
+                backoff_factor=HTTP_RETRY_BACKOFF
+            )
+        )
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Close the HTTP sessions and any pooled connections"""
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+        self._adapter.close()
+
+    def _get_session(self) -> requests.Session:
+        """Get the HTTP session of the calling thread, creating it if needed"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
     #####
     # FILTERING
     #####
@@ -86,7 +141,8 @@ class CliExecGeospatial:
 
         method = "POST"
         response = httputils.httprequest(
-            self.host, self.port, service, method, obj=params)
+            self.host, self.port, service, method, obj=params,
+            session=self._get_session())
         return response
 
     def show_cell_point(
@@ -115,7 +171,8 @@ class CliExecGeospatial:
             service = f"{point_router.POINT_ENDPOINT_PREFIX}/cell/point/{dataset}"
         method = "POST"
         response = httputils.httprequest(
-            self.host, self.port, service, method, obj=params)
+            self.host, self.port, service, method, obj=params,
+            session=self._get_session())
         return response
 
     def show_latlong_radius(
@@ -152,7 +209,8 @@ class CliExecGeospatial:
         logger.info(f"calling server at url {service}")
         method = "POST"
         response = httputils.httprequest(
-            self.host, self.port, service, method, obj=params)
+            self.host, self.port, service, method, obj=params,
+            session=self._get_session())
         return response
 
     def show_latlong_point(
@@ -181,10 +239,45 @@ class CliExecGeospatial:
 
         service = f"{geomesh_router.GEO_ENDPOINT_PREFIX}/latlong/point/{dataset}"
         method = "POST"
-        response = httputils.httprequest(self.host, self.port, service, method,
-                                         obj=params)
+        response = httputils.httprequest(
+            self.host, self.port, service, method,
+            obj=params, session=self._get_session())
         return response
 
+    def show_many_latlong_point(
+            self,
+            dataset: str,
+            points: List[Dict[str, Any]]
+    ) -> List[Any]:
+        """
+        Retrieve the data for the cells containing many points, issuing
+        the requests concurrently over the shared connection pool.
+
+        :param dataset: The name of the dataset to retrieve data for
+        :type dataset: str
+        :param points:
+            The points to retrieve data for. Each entry has the keyword
+            arguments of show_latlong_point other than dataset; latitude
+            and longitude are required, and all others default to None.
+        :type points: List[Dict[str, Any]]
+        :return: The response for each point, in the same order as the points
+        :rtype: List[Any]
+        """
+        def show_point(point: Dict[str, Any]) -> Any:
+            return self.show_latlong_point(
+                dataset,
+                point["latitude"],
+                point["longitude"],
+                point.get("resolution"),
+                point.get("year"),
+                point.get("month"),
+                point.get("day")
+            )
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            return list(executor.map(show_point, points))
+
     def show_shapefile(
             self,
             dataset: str,
@@ -214,8 +307,9 @@ class CliExecGeospatial:
             service = f"{point_router.POINT_ENDPOINT_PREFIX}/shapefile/{dataset}"
         method = "POST"
 
-        response = httputils.httprequest(self.host, self.port, service, method,
-                                         obj=params)
+        response = httputils.httprequest(
+            self.host, self.port, service, method,
+            obj=params, session=self._get_session())
         return response
 
     def add_meta(
@@ -240,7 +334,7 @@ class CliExecGeospatial:
             self,
             database_dir: str
     ) -> List[Dict[str, Any]]:
-        meta = metadata.MetadataDB(database_dir)
+        meta = metadata.MetadataDB(database_dir, read_only=True)
         return meta.show_meta()
 
     def filter(self, shapefile: str, resolution: int, tolerance: float) -> List:
@@ -277,8 +371,8 @@ class CliExecGeospatial:
             ds_type: str,
             visualizer_type: str = "HexGridVisualizer"
     ):
-        geo = Geomesh(database_dir)
-        ds = geo.bounding_box_get(
+        geo = Geomesh(database_dir, read_only=True)
+        ds_pandas = geo.bounding_box_get_df(
             dataset,
             resolution,
             min_lat,
@@ -289,7 +383,6 @@ class CliExecGeospatial:
             month,
             day
         )
-        ds_pandas = pandas.json_normalize(ds)
 
         if visualizer_type == "HexGridVisualizer":
             vis = visualizer.HexGridVisualizer(
@@ -2,6 +2,7 @@
 #
 # Created: 2023-10-16 by eric.broda@brodagroupsoftware.com
 
+import hashlib
 import logging
 import math
 import os
@@ -10,6 +11,8 @@ from typing import Tuple, List, Any, Dict, Optional, Set
 
 import duckdb
 import h3
+import numpy
+import pandas
 from pydantic import BaseModel, Field
 from shapely.geometry import Polygon
 
@@ -19,6 +22,7 @@ import metadata
 import dataset_utilities
 import visualizer
 import shape
+from bgsexception import ShapefileTooComplexException
 
 # Set up logging
 LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
@@ -48,6 +52,13 @@ KM_PER_DEGREE = 110  # Each degree is about 110 KM
 MIN_LAT, MAX_LAT = -60.0, 85.0  # Excluding Antarctica
 MIN_LONG, MAX_LONG = -180.0, 180.0  # Full range of longitudes
 
+# Directory, within the database directory, holding the cached h3 cells
+# covering each shapefile/region/resolution that has been queried
+H3_COVER_CACHE_DIR = "h3_cover"
+# Maximum number of coverings kept in the cache directory. Once exceeded,
+# the oldest coverings are deleted.
+H3_COVER_CACHE_MAX_FILES = 1000
+
 
 class CellDataRow(BaseModel):
     cell: str = Field(description="The cell that this data row represents")
@@ -126,7 +137,8 @@ class Geomesh:
 
     def __init__(
             self,
-            geo_out_db_dir: str | None
+            geo_out_db_dir: str | None,
+            read_only: bool = False
     ):
         """
         Initialize class
@@ -135,9 +147,14 @@ class Geomesh:
             The directory where databases containing processed data
             will be created
         :type geo_out_db_dir: str
+        :param read_only:
+            If True, the metadata and dataset databases are opened read-only,
+            so that other processes may read them at the same time
+        :type read_only: bool
         """
 
         self.geo_out_db_dir = geo_out_db_dir
+        self.read_only = read_only
 
         # some commands don't need database, so allow None in that case
         if geo_out_db_dir is not None:
@@ -146,8 +163,8 @@ class Geomesh:
                     f"database directory {self.geo_out_db_dir} did not"
                     f"exist. Creating this directory now.")
                 os.makedirs(self.geo_out_db_dir)
-            self.metadb = metadata.MetadataDB(self.geo_out_db_dir)
-
+            self.metadb = metadata.MetadataDB(
+                self.geo_out_db_dir, read_only)
 
 
     def shapefile_get(
@@ -158,7 +175,8 @@ class Geomesh:
             resolution: int,
             year: Optional[int],
             month: Optional[int],
-            day: Optional[int]
+            day: Optional[int],
+            max_vertices: Optional[int] = None
     ) -> List[CellDataRow]:
         """
         Retrieve data within the region(s) defined by a shapefile.
@@ -182,8 +200,15 @@ class Geomesh:
         :type month: Optional[int]
         :param day: The day to retrieve data for
         :type day: Optional[int]
+        :param max_vertices:
+            The maximum number of vertices the shapefile may have, if its
+            cells are not already cached. If None, there is no limit.
+        :type max_vertices: Optional[int]
         :return: The data in the specified area
         :rtype: List[Dict[str, Any]]
+
+        :raises ShapefileTooComplexException:
+            if the shapefile has more than max_vertices vertices
         """
 
         if not self.metadb.ds_meta_exists(dataset_name):
@@ -198,20 +223,8 @@ class Geomesh:
             dataset_name, ds_type, resolution
         )
 
-        buffer = Geomesh.get_buffer(resolution)
-
-        shp = shape.Shape(shapefile)
-
-        cells = list(shp.get_h3_in_shape(
-            buffer,
-            resolution,
-            True,
-            region,
-            MIN_LONG,
-            MAX_LONG,
-            MIN_LAT,
-            MAX_LAT
-        ))
+        cells = self._get_shapefile_cells(
+            shapefile, region, resolution, max_vertices)
 
         if not os.path.exists(self.geo_out_db_dir):
             raise ValueError(
@@ -221,7 +234,8 @@ class Geomesh:
         value_columns = ", ".join(col_names)
 
         out_db_path = self._get_db_path(dataset_name)
-        connection = duckdb.connect(database=out_db_path)
+        connection = duckdb.connect(
+            database=out_db_path, read_only=self.read_only)
 
         time_filter, time_params = self._get_time_filters(
             meta["interval"], year, month, day)
@@ -340,7 +354,8 @@ class Geomesh:
                 f"dataset {dataset_name} not registered in metadata.")
 
         out_db_path = self._get_db_path(dataset_name)
-        connection = duckdb.connect(database=out_db_path)
+        connection = duckdb.connect(
+            database=out_db_path, read_only=self.read_only)
 
         time_filter, time_params = self._get_time_filters(
             meta["interval"], year, month, day)
@@ -485,7 +500,8 @@ class Geomesh:
         )
 
         out_db_path = self._get_db_path(dataset_name)
-        connection = duckdb.connect(database=out_db_path)
+        connection = duckdb.connect(
+            database=out_db_path, read_only=self.read_only)
 
         col_list = connection.execute(f"describe {table_name}").fetchall()
         all_col_names = list(map(
@@ -605,7 +621,8 @@ class Geomesh:
         )
 
         out_db_path = self._get_db_path(dataset_name)
-        connection = duckdb.connect(database=out_db_path)
+        connection = duckdb.connect(
+            database=out_db_path, read_only=self.read_only)
 
         time_filter, time_params = self._get_time_filters(
             meta["interval"], year, month, day)
@@ -714,7 +731,8 @@ class Geomesh:
         )
 
         out_db_path = os.path.join(self.geo_out_db_dir, db_name)
-        connection = duckdb.connect(database=out_db_path)
+        connection = duckdb.connect(
+            database=out_db_path, read_only=self.read_only)
 
         params = [cell]
 
@@ -771,7 +789,8 @@ class Geomesh:
         )
 
         out_db_path = os.path.join(self.geo_out_db_dir, db_name)
-        connection = duckdb.connect(database=out_db_path)
+        connection = duckdb.connect(
+            database=out_db_path, read_only=self.read_only)
 
         params = [cell]
 
@@ -849,6 +868,114 @@ class Geomesh:
             day
         )
 
+    def cell_id_to_value_h3_batch(
+            self,
+            dataset_name: str,
+            queries: List[Tuple[str, Optional[int], Optional[int], Optional[int]]]
+    ) -> List[List[CellDataRow]]:
+        """
+        Retrieve geo data for many cells in a dataset at once. Cells that
+        share a resolution and time period are retrieved with a single query.
+
+        :param dataset_name: The name of the dataset to retrieve data for
+        :type dataset_name: str
+        :param queries:
+            The cells to retrieve data for, as (cell, year, month, day) tuples
+        :type queries:
+            List[Tuple[str, Optional[int], Optional[int], Optional[int]]]
+        :return:
+            The data for each cell, in the same order as the queries.
+            Cells with no data have an empty list.
+        :rtype: List[List[CellDataRow]]
+        """
+
+        if not self.metadb.ds_meta_exists(dataset_name):
+            raise Exception(f"dataset {dataset_name} not registered"
+                            f" in metadata.")
+
+        meta = self.metadb.get_ds_metadata(dataset_name)
+        col_names: List[str] = meta["value_columns"]["key"]
+        value_columns = ", ".join(col_names)
+        ds_type = meta["dataset_type"]
+        if ds_type != "h3":
+            raise ValueError(
+                "the dataset specified was not an h3 dataset. This dataset:"
+                f" {dataset_name} is of type: {ds_type}"
+            )
+
+        # group queries that can be answered by the same table and time filter
+        groups: Dict[Tuple[int, Optional[int], Optional[int], Optional[int]],
+                     List[int]] = {}
+        for index, (cell, year, month, day) in enumerate(queries):
+            key = (h3.h3_get_resolution(cell), year, month, day)
+            groups.setdefault(key, []).append(index)
+
+        out_db_path = self._get_db_path(dataset_name)
+        connection = duckdb.connect(
+            database=out_db_path, read_only=self.read_only)
+
+        out: List[List[CellDataRow]] = [[] for _ in queries]
+        for (resolution, year, month, day), indices in groups.items():
+            table_name = self._table_name_from_ds_type(
+                dataset_name, ds_type, resolution
+            )
+
+            time_filter, time_params = self._get_time_filters(
+                meta["interval"], year, month, day)
+
+            cells = list(dict.fromkeys(queries[i][0] for i in indices))
+            placeholders = ", ".join("?" for _ in cells)
+            cell_where = f"cell IN ({placeholders})"
+            full_where = self._combine_where_clauses([cell_where, time_filter])
+
+            sql = f"""
+                SELECT cell, latitude, longitude, {value_columns}
+                FROM {table_name}
+                {full_where}
+            """
+
+            rows = connection.execute(sql, cells + time_params).fetchall()
+
+            by_cell: Dict[str, CellDataRow] = {}
+            for row in self._row_to_cell_out(rows, col_names):
+                by_cell.setdefault(row.cell, row)
+
+            for i in indices:
+                row = by_cell.get(queries[i][0])
+                if row is not None:
+                    out[i] = [row]
+
+        return out
+
+    def lat_long_to_value_batch(
+            self,
+            dataset_name: str,
+            points: List[Tuple[float, float, int, Optional[int],
+                               Optional[int], Optional[int]]]
+    ) -> List[List[CellDataRow]]:
+        """
+        Retrieve geo data for the cells that contain many points at once.
+
+        :param dataset_name: The name of the dataset to retrieve data for
+        :type dataset_name: str
+        :param points:
+            The points to retrieve data for, as
+            (latitude, longitude, resolution, year, month, day) tuples
+        :type points:
+            List[Tuple[float, float, int, Optional[int],
+            Optional[int], Optional[int]]]
+        :return:
+            The data for the cell containing each point, in the same order
+            as the points. Points with no data have an empty list.
+        :rtype: List[List[CellDataRow]]
+        """
+
+        queries = [
+            (h3.geo_to_h3(latitude, longitude, resolution), year, month, day)
+            for latitude, longitude, resolution, year, month, day in points
+        ]
+        return self.cell_id_to_value_h3_batch(dataset_name, queries)
+
     def filter(
             self, shapefile: str, resolution: int = 0, tolerance: float = 0.1
     ) -> List[str]:
@@ -862,7 +989,9 @@ class Geomesh:
         :type shapefile: str
         :param resolution: The h3 resolution level to calculate for
         :type resolution: int
-        :param tolerance: TODO: CURRENTLY UNUSED, PURPOSE UNCLEAR
+        :param tolerance:
+            The tolerance used to simplify the shapefile's polygons before
+            cells are calculated. 0 disables simplification.
         :type tolerance: float
         :return: List of cell IDs for cells that passed the filter
         :rtype: List[str]
@@ -874,6 +1003,7 @@ class Geomesh:
             f"Total cells using resolution:{resolution} total_cells:{total_cells} cell_km2:{cell_km2}")
 
         shp = shape.Shape(shapefile)
+        shp.simplify_for_h3(tolerance)
         buffer = Geomesh.get_buffer(resolution)
         cells_included = shp.get_h3_in_shape(
             buffer,
@@ -907,6 +1037,98 @@ class Geomesh:
             month: Optional[int],
             day: Optional[int]
     ) -> List[Dict[str, Any]]:
+        connection, sql, time_params, col_names = self._bounding_box_query(
+            dataset_name,
+            resolution,
+            min_lat,
+            max_lat,
+            min_long,
+            max_long,
+            year,
+            month,
+            day
+        )
+
+        data = connection.execute(sql, time_params).fetchall()
+
+        # format output as a json object
+        out = []
+        for row in data:
+            num_val_cols = len(col_names)
+            out_json = {
+                "cell": row[0],
+                "latitude": row[1],
+                "longitude": row[2],
+            }
+            for i in range(0, num_val_cols):
+                index = i + 3
+                out_json[col_names[i]] = row[index]
+            out.append(out_json)
+        return out
+
+    def bounding_box_get_df(
+            self,
+            dataset_name: str,
+            resolution: int,
+            min_lat: float,
+            max_lat: float,
+            min_long: float,
+            max_long: float,
+            year: Optional[int],
+            month: Optional[int],
+            day: Optional[int]
+    ) -> pandas.DataFrame:
+        """
+        Retrieve the same data as bounding_box_get, but as a DataFrame
+        built directly by duckdb rather than from per-row dictionaries.
+
+        :return:
+            The data within the bounding box, with cell, latitude,
+            longitude, and value columns
+        :rtype: pandas.DataFrame
+        """
+        connection, sql, time_params, _ = self._bounding_box_query(
+            dataset_name,
+            resolution,
+            min_lat,
+            max_lat,
+            min_long,
+            max_long,
+            year,
+            month,
+            day
+        )
+
+        return connection.execute(sql, time_params).fetchdf()
+
+    #####
+    # INTERNAL
+    #####
+
+    def _bounding_box_query(
+            self,
+            dataset_name: str,
+            resolution: int,
+            min_lat: float,
+            max_lat: float,
+            min_long: float,
+            max_long: float,
+            year: Optional[int],
+            month: Optional[int],
+            day: Optional[int]
+    ) -> Tuple[duckdb.DuckDBPyConnection, str, List[Any], List[str]]:
+        """
+        Build the query that retrieves all data within a bounding box.
+        The cells in the bounding box are registered with the connection
+        as a relation, so that they can be matched with a single join
+        rather than written out into IN clauses.
+
+        :return:
+            The connection to run the query on, the query, the
+            parameters for the query, and the names of the value columns
+        :rtype:
+            Tuple[duckdb.DuckDBPyConnection, str, List[Any], List[str]]
+        """
         if not self.metadb.ds_meta_exists(dataset_name):
             raise Exception(f"dataset {dataset_name} not registered"
                             f" in metadata.")
@@ -920,38 +1142,25 @@ class Geomesh:
         )
 
         ds_db_path = self._get_db_path(dataset_name)
-        connection = duckdb.connect(database=ds_db_path)
+        connection = duckdb.connect(
+            database=ds_db_path, read_only=self.read_only)
 
-        col_names: List[str] = meta["value_columns"]["key"]
         value_columns = ", ".join(col_names)
 
-        cells = list(self._get_h3_in_boundary(
-            resolution,
-            min_lat,
-            max_lat,
-            min_long,
-            max_long,
-        ))
+        cells = pandas.DataFrame({
+            "cell": list(self._get_h3_in_boundary(
+                resolution,
+                min_lat,
+                max_lat,
+                min_long,
+                max_long,
+            ))
+        }, dtype=object)
+        connection.register("bounding_box_cells", cells)
 
         time_filter, time_params = self._get_time_filters(
             meta["interval"], year, month, day)
 
-        cells_per_part = 20000
-        if len(cells) > cells_per_part:
-            num_parts = math.ceil(float(len(cells)) / float(20000))
-
-            cells_split = []
-            for index in range(num_parts):
-                cells_split.append(
-                    cells[
-                    index * cells_per_part:
-                    cells_per_part * (index + 1)
-                    ])
-        else:
-            cells_split = [list(cells)]
-
-        data = []
-
         if ds_type == "h3":
             cell_column = "cell"
         elif ds_type == "point":
@@ -963,46 +1172,170 @@ class Geomesh:
                 f" Provided type was: {ds_type}"
             )
 
-        for cell_part in cells_split:
-            part_str = ""
-            for cell in cell_part:
-                part_str = part_str + f"'{cell}',"
-            part_str = part_str[:-1]
-            in_clause = f"""
-                          {cell_column} IN ({part_str})
-                       """
+        in_clause = f"""
+            {cell_column} IN (SELECT cell FROM bounding_box_cells)
+        """
 
-            full_where = self._combine_where_clauses([time_filter, in_clause])
+        full_where = self._combine_where_clauses([time_filter, in_clause])
 
-            sql = f"""
-                       SELECT {cell_column}, latitude, longitude, {value_columns}
-                       FROM {table_name}
-                       {full_where}
-                   """
+        sql = f"""
+            SELECT {cell_column} AS cell, latitude, longitude, {value_columns}
+            FROM {table_name}
+            {full_where}
+        """
 
-            res = connection.execute(sql, time_params).fetchall()
+        return connection, sql, time_params, col_names
 
-            for res_row in res:
-                data.append(res_row)
+    def _get_shapefile_cells(
+            self,
+            shapefile: str,
+            region: Optional[str],
+            resolution: int,
+            max_vertices: Optional[int] = None
+    ) -> List[str]:
+        """
+        Get the h3 cells covering a shapefile (or a region within it).
+        The covering is expensive to calculate, so it is cached on disk
+        and reused for as long as the shapefile's contents do not change.
+        The vertex limit is only checked when the covering is calculated.
 
-        # format output as a json object
-        out = []
-        for row in data:
-            num_val_cols = len(col_names)
-            out_json = {
-                "cell": row[0],
-                "latitude": row[1],
-                "longitude": row[2],
-            }
-            for i in range(0, num_val_cols):
-                index = i + 3
-                out_json[col_names[i]] = row[index]
-            out.append(out_json)
-        return out
+        :param shapefile: The path to a local .shp shapefile
+        :type shapefile: str
+        :param region:
+            The name of a region within the shapefile. If None, all
+            polygons within the shapefile are covered.
+        :type region: Optional[str]
+        :param resolution: The h3 resolution level of the cells
+        :type resolution: int
+        :param max_vertices:
+            The maximum number of vertices the shapefile, or the region
+            within it, may have. If None, there is no limit.
+        :type max_vertices: Optional[int]
+        :return: The IDs of the cells covering the shapefile
+        :rtype: List[str]
 
-    #####
-    # INTERNAL
-    #####
+        :raises ShapefileTooComplexException:
+            if the shapefile has more than max_vertices vertices
+        """
+        cache_path = self._get_cover_cache_path(shapefile, region, resolution)
+        if os.path.exists(cache_path):
+            covering = numpy.load(cache_path, mmap_mode="r")
+            return [h3.h3_to_string(int(cell)) for cell in covering]
+
+        buffer = Geomesh.get_buffer(resolution)
+
+        shp = shape.Shape(shapefile)
+
+        if max_vertices is not None:
+            # only the geometries that are tessellated count towards the limit
+            num_vertices = shp.count_vertices(region)
+            if num_vertices > max_vertices:
+                raise ShapefileTooComplexException(
+                    f"shapefile is too complex: it has {num_vertices}"
+                    f" vertices. Maximum is {max_vertices} vertices"
+                )
+
+        cells = list(shp.get_h3_in_shape(
+            buffer,
+            resolution,
+            True,
+            region,
+            MIN_LONG,
+            MAX_LONG,
+            MIN_LAT,
+            MAX_LAT
+        ))
+
+        covering = numpy.array(
+            sorted(h3.string_to_h3(cell) for cell in cells),
+            dtype=numpy.uint64
+        )
+        self._write_cover_cache(cache_path, covering)
+
+        return cells
+
+    def _write_cover_cache(self, cache_path: str, covering: numpy.ndarray):
+        """
+        Write a covering to the cache. The cache is only an optimization,
+        so a failure to write it (ex. a read-only or full disk) is logged
+        rather than raised.
+
+        :param cache_path: The path to write the covering to
+        :type cache_path: str
+        :param covering: The h3 cells of the covering, as integers
+        :type covering: numpy.ndarray
+        """
+        # write to a temporary file first, so that a partially written
+        #  covering is never read by a concurrent request
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, "wb") as file:
+                numpy.save(file, covering)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"could not write h3 cover cache {cache_path}: {e}")
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        self._evict_cover_cache(os.path.dirname(cache_path))
+
+    def _evict_cover_cache(self, cache_dir: str):
+        """
+        Delete the oldest coverings in the cache directory, until no more
+        than H3_COVER_CACHE_MAX_FILES remain
+
+        :param cache_dir: The cache directory
+        :type cache_dir: str
+        """
+        try:
+            entries = [
+                entry for entry in os.scandir(cache_dir)
+                if entry.name.endswith(".npy")
+            ]
+            if len(entries) <= H3_COVER_CACHE_MAX_FILES:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+        except OSError as e:
+            logger.warning(f"could not list h3 cover cache {cache_dir}: {e}")
+            return
+
+        for entry in entries[:len(entries) - H3_COVER_CACHE_MAX_FILES]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                # already deleted by a concurrent request, or not deletable
+                pass
+
+    def _get_cover_cache_path(
+            self,
+            shapefile: str,
+            region: Optional[str],
+            resolution: int
+    ) -> str:
+        # the .dbf file holds region names, so it is part of the key as well
+        digest = hashlib.sha256()
+        for path in [shapefile, os.path.splitext(shapefile)[0] + ".dbf"]:
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                        digest.update(chunk)
+        # None (the whole shapefile) is marked differently from every
+        #  region name, including one literally named "None"
+        if region is None:
+            digest.update(b"\x00")
+        else:
+            digest.update(b"\x01" + region.encode())
+
+        return os.path.join(
+            self.geo_out_db_dir,
+            H3_COVER_CACHE_DIR,
+            f"{digest.hexdigest()}_{resolution}.npy"
+        )
 
     def _row_to_cell_out(
             self,
@@ -1085,7 +1418,7 @@ class Geomesh:
         if interval not in metadata.VALID_META_INTERVALS:
             raise ValueError(
                 f"recieved invalid interval: {interval}. Valid intervals"
-                f" are {metadata.VALID_META_INTERVALS}"
+                f" are {list(metadata.VALID_META_INTERVALS_DISPLAY)}"
             )
 
         has_year = ["yearly", "monthly", "daily"]
@@ -1133,7 +1466,7 @@ class Geomesh:
         if ds_type not in metadata.VALID_DATASET_TYPES:
             raise ValueError(
                 f"dataset type: {ds_type} is not a valid type."
-                f" Valid types: {metadata.VALID_DATASET_TYPES}"
+                f" Valid types: {list(metadata.VALID_DATASET_TYPES_DISPLAY)}"
             )
 
         if ds_type == "h3":
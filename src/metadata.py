@@ -7,7 +7,11 @@
 # Created: 2024-03-08 by davis.broda@brodagroupsoftware.com
 import logging
 import os
-from typing import Dict, List, Any
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
 
 import duckdb
 from duckdb.duckdb import ConstraintException
@@ -18,17 +22,118 @@ from utilities import duckdbutils
 METADATA_DB_NAME = "dataset_metadata"
 METADATA_TABLE_NAME = "dataset_metadata"
 
-VALID_META_INTERVALS = [
+# the ordered tuples are used in error messages, the sets for membership
+VALID_META_INTERVALS_DISPLAY = (
     "one_time",
     "yearly",
     "monthly",
     "daily"
-]
+)
+VALID_META_INTERVALS = frozenset(VALID_META_INTERVALS_DISPLAY)
 
-VALID_DATASET_TYPES = [
+VALID_DATASET_TYPES_DISPLAY = (
     "h3",
     "point"
-]
+)
+VALID_DATASET_TYPES = frozenset(VALID_DATASET_TYPES_DISPLAY)
+
+# The metadata statements are fixed, so they are built once at import
+# rather than being re-formatted on every call.
+#
+# name to identify
+# dataset_type to let us know what type of data is in the dataset
+#   available types: h3, point
+# interval is for what time period data is available
+#  (yearly, monthly, daily, etc.)
+CREATE_METADATA_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {METADATA_TABLE_NAME} (
+        dataset_name    VARCHAR PRIMARY KEY,
+        description     VARCHAR,
+        value_columns   MAP(VARCHAR, VARCHAR),
+        interval        VARCHAR,
+        dataset_type    VARCHAR
+    )
+"""
+
+INSERT_METADATA_SQL = f"""
+    INSERT INTO {METADATA_TABLE_NAME} VALUES (?,?,?,?,?)
+"""
+
+# The columns of the metadata table, in the order they are selected
+METADATA_COLUMNS = (
+    "dataset_name",
+    "description",
+    "value_columns",
+    "interval",
+    "dataset_type"
+)
+
+SHOW_METADATA_SQL = f"""
+    SELECT {", ".join(METADATA_COLUMNS)}
+    FROM {METADATA_TABLE_NAME}
+"""
+
+METADATA_EXISTS_SQL = f"""
+    SELECT count(*)
+    FROM {METADATA_TABLE_NAME}
+    WHERE dataset_name = ?
+"""
+
+GET_METADATA_SQL = SHOW_METADATA_SQL + """
+    WHERE dataset_name = ?
+"""
+
+# Matches a run of characters that are not allowed in a column name
+INVALID_COLUMN_CHARS_REGEX = re.compile(r"[^A-Za-z0-9]+")
+
+# Dataset metadata only changes through add_metadata_entry, so lookups are
+# cached in memory. Only datasets that were found are cached, so a dataset
+# registered by another process (such as addmeta run while the server is
+# up) is found straight away. Entries expire after a while, so that other
+# changes made by another process, such as the metadata database being
+# replaced, are eventually picked up.
+METADATA_CACHE_MAX_SIZE = 256
+METADATA_CACHE_TTL_SECONDS = 60
+
+# (database_dir, dataset_name) -> (time cached, metadata)
+_metadata_cache: OrderedDict = OrderedDict()
+_metadata_cache_lock = threading.Lock()
+
+
+def clear_metadata_cache():
+    """Remove every entry from the dataset metadata cache"""
+    with _metadata_cache_lock:
+        _metadata_cache.clear()
+
+
+def _get_cached_metadata(
+        database_dir: str,
+        dataset_name: str
+) -> Optional[Dict[str, Any]]:
+    key = (database_dir, dataset_name)
+    with _metadata_cache_lock:
+        entry = _metadata_cache.get(key)
+        if entry is None:
+            return None
+        cached_at, meta = entry
+        if time.monotonic() - cached_at > METADATA_CACHE_TTL_SECONDS:
+            del _metadata_cache[key]
+            return None
+        _metadata_cache.move_to_end(key)
+        return meta
+
+
+def _cache_metadata(
+        database_dir: str,
+        dataset_name: str,
+        meta: Dict[str, Any]
+):
+    with _metadata_cache_lock:
+        _metadata_cache[(database_dir, dataset_name)] = (time.monotonic(), meta)
+        _metadata_cache.move_to_end((database_dir, dataset_name))
+        while len(_metadata_cache) > METADATA_CACHE_MAX_SIZE:
+            _metadata_cache.popitem(last=False)
+
 
 # Set up logging
 LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
@@ -40,14 +145,45 @@ class MetadataDB:
 
     def __init__(
             self,
-            database_dir: str
+            database_dir: str,
+            read_only: bool = False
     ):
+        """
+        Open the metadata database within a database directory
+
+        :param database_dir: The directory containing the metadata database
+        :type database_dir: str
+        :param read_only:
+            If True, the metadata database is opened read-only, and entries
+            cannot be added. Any number of processes may read the database
+            at once, but not while another process is writing to it.
+        :type read_only: bool
+        """
         self.database_dir = database_dir
+        self.read_only = read_only
         if not os.path.exists(self.database_dir):
             logger.info(f"metadata database directory {database_dir} did not"
                         f"exist. Creating this directory now.")
             os.makedirs(self.database_dir)
 
+        self._metadata_db_path = os.path.join(
+            self.database_dir, f"{METADATA_DB_NAME}.duckdb")
+
+        # a database must exist before it can be opened read-only
+        if read_only and not os.path.exists(self._metadata_db_path):
+            duckdb.connect(database=self._metadata_db_path).close()
+
+        # The metadata table is never dropped, so once it has been seen to
+        # exist there is no need to check the catalog for it again
+        self._metadata_table_exists: Optional[bool] = None
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        # Connections are only held for a single operation, as duckdb locks
+        #  the database file for as long as a connection is open. Lookups
+        #  are cached, so most of them do not need a connection at all.
+        return duckdb.connect(
+            database=self._metadata_db_path, read_only=self.read_only)
+
     def add_metadata_entry(
             self,
             dataset_name: str,
@@ -79,28 +215,36 @@ class MetadataDB:
         :rtype: str
 
         :raises ValueError:
-            if the dataset being created already exists
+            if the dataset being created already exists, or if the
+            metadata database was opened read-only
         """
 
+        if self.read_only:
+            raise ValueError(
+                f"metadata database {self._metadata_db_path} was opened"
+                f" read-only, so entries cannot be added")
+
         if dataset_name == METADATA_DB_NAME:
             raise ValueError(f"name {METADATA_DB_NAME} is reserved,"
                             f" and cannot be used as a dataset name.")
 
-        for col_name in value_columns.keys():
-            non_al_num = self._get_non_alphanum_chars(col_name)
-            if len(non_al_num) > 0:
+        for col_name in value_columns:
+            invalid = INVALID_COLUMN_CHARS_REGEX.search(col_name)
+            if invalid:
                 raise ValueError(
                     f"column names must be alphanumeric."
                     f" column name: [{col_name}] contained"
-                    f" non-alphanumeric character(s): [{non_al_num}]"
+                    f" non-alphanumeric character(s): [{invalid.group()}]"
                 )
 
+        # the canonical types are collected into a new dict, leaving the
+        #  caller's value_columns unchanged
+        canonical_columns = {}
         col_errors = []
-        for k, v in value_columns.copy().items():
-            is_valid, error = duckdbutils.is_general_col_type(v)
-            if is_valid:
-                cannonical_type = duckdbutils.convert_to_cannonical_type(v)
-                value_columns[k] = cannonical_type
+        for k, v in value_columns.items():
+            canonical_type, error = duckdbutils.to_cannonical_general_type(v)
+            if canonical_type is not None:
+                canonical_columns[k] = canonical_type
             else:
                 full_error = f"column {k} was found invalid for reason: {error}"
                 col_errors.append(full_error)
@@ -114,171 +258,117 @@ class MetadataDB:
         if dataset_type not in VALID_DATASET_TYPES:
             raise ValueError(
                 f"dataset type: {dataset_type} was not valid."
-                f" Valid dataset types are: {VALID_DATASET_TYPES}"
+                f" Valid dataset types are: {list(VALID_DATASET_TYPES_DISPLAY)}"
             )
 
         if interval not in VALID_META_INTERVALS:
             raise ValueError(
                 f"interval: {interval} was not valid."
-                f" Valid intervals are: {VALID_META_INTERVALS}"
+                f" Valid intervals are: {list(VALID_META_INTERVALS_DISPLAY)}"
             )
 
-        out_db_path = self._get_db_path(METADATA_DB_NAME)
-        connection = duckdb.connect(database=out_db_path)
-
-        # one dataset, with year, month, day
-        # and have a time-reslution thing that says whether monthly, daily, etc. data is available
-        if not duckdbutils.duckdb_check_table_exists(
-                connection, METADATA_TABLE_NAME
-        ):
-            # name to identify
-            # dataset_type to let us know what type of data is in the dataset
-            #   available types: h3, point
-            # interval is for what time period data is available
-            #  (yearly, monthly, daily, etc.)
-            create_sql = f"""
-                CREATE TABLE IF NOT EXISTS {METADATA_TABLE_NAME} (
-                    dataset_name    VARCHAR PRIMARY KEY,
-                    description     VARCHAR,
-                    value_columns   MAP(VARCHAR, VARCHAR),
-                    interval        VARCHAR,
-                    dataset_type    VARCHAR
-                )
-            """
-            connection.execute(create_sql)
-
-        insert = f"""
-            INSERT INTO {METADATA_TABLE_NAME} VALUES (?,?,?,?,?)
-        """
-
         # This format is necessary for duckdb to recognize this as a MAP
         #  instead of a STRUCT
         val_col_map = {
-            "key": list(value_columns.keys()),
-            "value": list(value_columns.values())
+            "key": list(canonical_columns),
+            "value": list(canonical_columns.values())
         }
 
-        try:
-            connection.execute(
-                insert,
-                [dataset_name, description, val_col_map, interval, dataset_type]
-            )
-        except ConstraintException as e:
-            raise ValueError(
-                f"dataset with name {dataset_name} already exists",
-                e
-            ) from e
-        finally:
-            connection.close()
+        with self._connect() as connection:
+            # one dataset, with year, month, day
+            # and have a time-reslution thing that says whether monthly, daily, etc. data is available
+            if not self._check_metadata_table_exists(connection):
+                connection.execute(CREATE_METADATA_SQL)
+                self._metadata_table_exists = True
+
+            try:
+                connection.execute(
+                    INSERT_METADATA_SQL,
+                    [dataset_name, description, val_col_map, interval,
+                     dataset_type]
+                )
+            except ConstraintException as e:
+                raise ValueError(
+                    f"dataset with name {dataset_name} already exists",
+                    e
+                ) from e
+
+        clear_metadata_cache()
 
         logger.info(f"added entry for dataset {dataset_name}")
         return f"{dataset_name}"
 
 
     def show_meta(self) -> List[Dict[str, Any]]:
-        out_db_path = self._get_db_path(METADATA_DB_NAME)
-        connection = duckdb.connect(database=out_db_path)
+        with self._connect() as connection:
+            if not self._check_metadata_table_exists(connection):
+                raise ValueError(f"{METADATA_TABLE_NAME} table does not exist")
 
-        if not duckdbutils.duckdb_check_table_exists(
-                connection, METADATA_TABLE_NAME
-        ):
-            raise ValueError(f"{METADATA_TABLE_NAME} table does not exist")
-
-        sql = f"""
-            SELECT
-                dataset_name,
-                description,
-                value_columns,
-                interval,
-                dataset_type
-            FROM {METADATA_TABLE_NAME}
-        """
-        result_raw = connection.execute(sql).fetchall()
-
-        out = []
-
-        for row in result_raw:
-            result = {
-                "dataset_name": row[0],
-                "description": row[1],
-                "value_columns": row[2],
-                "interval": row[3],
-                "dataset_type": row[4]
-            }
-            out.append(result)
-
-        return out
+            result_df = connection.execute(SHOW_METADATA_SQL).fetchdf()
+        return result_df.to_dict(orient="records")
 
 
     def ds_meta_exists(self, dataset_name: str) -> bool:
-        out_db_path = self._get_db_path(METADATA_DB_NAME)
-        connection = duckdb.connect(database=out_db_path)
+        if _get_cached_metadata(self.database_dir, dataset_name) is not None:
+            return True
 
-        if not duckdbutils.duckdb_check_table_exists(
-                connection, METADATA_TABLE_NAME
-        ):
-            raise ValueError(
-                f"{METADATA_TABLE_NAME} table does not exist"
-                f" in database {out_db_path}")
+        with self._connect() as connection:
+            if not self._check_metadata_table_exists(connection):
+                raise ValueError(
+                    f"{METADATA_TABLE_NAME} table does not exist"
+                    f" in database {self._metadata_db_path}")
 
-        sql = f"""
-                    SELECT count(*)
-                    FROM {METADATA_TABLE_NAME}
-                    WHERE dataset_name = ?
-                """
-        result_raw = connection.execute(sql, [dataset_name]).fetchone()
+            result_raw = connection.execute(
+                METADATA_EXISTS_SQL, [dataset_name]).fetchone()
 
         return result_raw[0] == 1
 
 
     def get_ds_metadata(self, dataset_name: str) -> Dict[str, Any]:
-        out_db_path = self._get_db_path(METADATA_DB_NAME)
-        connection = duckdb.connect(database=out_db_path)
+        """
+        Get the metadata for a dataset. Results are cached, and the
+        returned dictionary is shared between callers, so it must not
+        be modified.
 
-        if not duckdbutils.duckdb_check_table_exists(
-                connection, METADATA_TABLE_NAME
-        ):
-            raise ValueError(f"{METADATA_TABLE_NAME} table does not exist")
-
-        sql = f"""
-           SELECT
-                dataset_name,
-                description,
-                value_columns,
-                interval,
-                dataset_type
-           FROM {METADATA_TABLE_NAME}
-           WHERE dataset_name = ?
+        :param dataset_name: The name of the dataset
+        :type dataset_name: str
+        :return: The metadata for the dataset
+        :rtype: Dict[str, Any]
         """
-        result_raw = connection.execute(sql, [dataset_name]).fetchone()
-
-        result = {
-            "dataset_name": result_raw[0],
-            "description": result_raw[1],
-            "value_columns": result_raw[2],
-            "interval": result_raw[3],
-            "dataset_type": result_raw[4]
-        }
+        cached = _get_cached_metadata(self.database_dir, dataset_name)
+        if cached is not None:
+            return cached
 
-        col_names: List[str] = result["value_columns"]["key"]
+        with self._connect() as connection:
+            if not self._check_metadata_table_exists(connection):
+                raise ValueError(f"{METADATA_TABLE_NAME} table does not exist")
 
-        for c_name in col_names:
-            non_al_num = self._get_non_alphanum_chars(c_name)
-            if len(non_al_num) > 0:
-                raise ValueError(
-                    f"column names must be alphanumeric."
-                    f" column name: [{c_name}] contained"
-                    f" non-alphanumeric character(s): [{non_al_num}]"
-                )
+            result_raw = connection.execute(
+                GET_METADATA_SQL, [dataset_name]).fetchone()
+
+        result = dict(zip(METADATA_COLUMNS, result_raw))
 
+        # column names are not validated again here, as every entry
+        #  was validated by add_metadata_entry before being written
+        _cache_metadata(self.database_dir, dataset_name, result)
         return result
 
 
-    def _get_non_alphanum_chars(self, s: str) -> str:
-        char_to_remove = ''.join(filter(lambda x: x.isalnum(), s))
-        table = str.maketrans("", "", char_to_remove)
-        non_alpha = s.translate(table)
-        return non_alpha
+    def _check_metadata_table_exists(
+            self,
+            connection: duckdb.DuckDBPyConnection
+    ) -> bool:
+        """
+        Check whether the metadata table exists. The catalog is only queried
+        until the table has been found, after which the cached result is used.
 
-    def _get_db_path(self, db_name: str) -> str:
-        return os.path.join(self.database_dir, f"{db_name}.duckdb")
+        :param connection: connection to the metadata database
+        :type connection: duckdb.DuckDBPyConnection
+        :return: True if the metadata table exists, False otherwise
+        :rtype: bool
+        """
+        if not self._metadata_table_exists:
+            self._metadata_table_exists = duckdbutils.duckdb_check_table_exists(
+                connection, METADATA_TABLE_NAME
+            )
+        return self._metadata_table_exists
@@ -0,0 +1,31 @@
+# Copyright 2024 Broda Group Software Inc.
+#
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+from fastapi import HTTPException
+
+import state
+
+DEFAULT_MAX_BATCH_POINTS = 10_000
+
+
+def check_batch_size(num_points: int):
+    """
+    Reject a batch request with more points than can be looked up without
+    holding up other requests for too long. The limit may be set in the
+    server configuration as "max-points", under "batch-limits".
+
+    :param num_points: The number of points in the batch request
+    :type num_points: int
+    :raises HTTPException: 413 if there are more than the maximum points
+    """
+    max_points = state.get_global("batch_limits", {}).get(
+        "max-points", DEFAULT_MAX_BATCH_POINTS)
+
+    if num_points > max_points:
+        raise HTTPException(
+            status_code=413,
+            detail=f"too many points in batch: {num_points}."
+                   f" Maximum is {max_points} points"
+        )
@@ -9,10 +9,14 @@ from typing import Optional, Any, Dict, List
 import logging
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
-from geomesh import Geomesh, CellDataRow
+from bgsexception import ShapefileTooComplexException
+from geomesh import CellDataRow
+from .batch_limits import check_batch_size
 from .route_constants import API_PREFIX
+from .shapefile_limits import check_shapefile_size, get_max_shapefile_vertices
 import state
 
 LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
@@ -20,7 +24,9 @@ LOGGING_LEVEL = logging.INFO
 logging.basicConfig(format=LOGGING_FORMAT, level=LOGGING_LEVEL)
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# results can contain many thousands of rows, so they are encoded with
+#  orjson rather than the standard library json encoder
+router = APIRouter(default_response_class=ORJSONResponse)
 
 GEO_ENDPOINT_PREFIX = API_PREFIX + "/geomesh"
 
@@ -61,8 +67,7 @@ async def geomesh_latlong_radius_post(
     """
     logger.info(f"Retrieving data for lat-lon radius, dataset:{dataset} params:{params}")
 
-    db_dir = state.get_global("database_dir")
-    geo = Geomesh(db_dir)
+    geo = state.get_geomesh()
     try:
         return geo.lat_long_get_radius_h3(
             dataset,
@@ -110,8 +115,7 @@ async def geomesh_latlong_point_post(
 
     logger.info(f"Retrieving data for lat-lon point, dataset:{dataset} params:{params}")
 
-    db_dir = state.get_global("database_dir")
-    geo = Geomesh(db_dir)
+    geo = state.get_geomesh()
     try:
         resp = geo.lat_long_to_value(
             dataset,
@@ -127,6 +131,43 @@ async def geomesh_latlong_point_post(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class GeomeshLatLongPointBatchArgs(BaseModel):
+    points: List[GeomeshLatLongPointArgs] = Field(
+        description="The points to retrieve data for")
+
+
+@router.post(GEO_ENDPOINT_PREFIX + "/latlong/point/batch/{dataset}")
+async def geomesh_latlong_point_batch_post(
+        dataset: str,
+        params: GeomeshLatLongPointBatchArgs
+) -> List[List[CellDataRow]]:
+    """
+    Retrieve geo data for the cells that contain each of several points.
+
+    :return:
+        The data for the cell that contains each point, in the same order
+        as the requested points
+    :rtype: List[List[CellDataRow]]
+    """
+
+    logger.info(f"Retrieving data for {len(params.points)} lat-lon points,"
+                f" dataset:{dataset}")
+
+    check_batch_size(len(params.points))
+
+    geo = state.get_geomesh()
+    try:
+        return geo.lat_long_to_value_batch(
+            dataset,
+            [
+                (p.latitude, p.longitude, p.resolution, p.year, p.month, p.day)
+                for p in params.points
+            ]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 class GeomeshCellRadiusArgs(BaseModel):
     cell: str = Field(description="The ID of the central cell")
 
@@ -158,8 +199,7 @@ async def geomesh_cell_radius_post(
 
     logger.info(f"Retrieving data for cell radius, dataset:{dataset} params:{params}")
 
-    db_dir = state.get_global("database_dir")
-    geo = Geomesh(db_dir)
+    geo = state.get_geomesh()
     try:
         return geo.cell_get_radius_h3(
             dataset,
@@ -200,8 +240,7 @@ async def geomesh_cell_point(
 
     logger.info(f"Retrieving data for cell point, dataset:{dataset} params:{params}")
 
-    db_dir = state.get_global("database_dir")
-    geo = Geomesh(db_dir)
+    geo = state.get_geomesh()
     try:
         return geo.cell_id_to_value_h3(
             dataset,
@@ -214,6 +253,38 @@ async def geomesh_cell_point(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class GeomeshCellPointBatchArgs(BaseModel):
+    points: List[GeomeshCellPointArgs] = Field(
+        description="The cells to retrieve data for")
+
+
+@router.post(GEO_ENDPOINT_PREFIX + "/cell/point/batch/{dataset}")
+async def geomesh_cell_point_batch(
+        dataset: str,
+        params: GeomeshCellPointBatchArgs
+) -> List[List[CellDataRow]]:
+    """
+    Retrieve geo data for each of several cells
+
+    :return: The data for each cell, in the same order as the requested cells
+    :rtype: List[List[CellDataRow]]
+    """
+
+    logger.info(f"Retrieving data for {len(params.points)} cells,"
+                f" dataset:{dataset}")
+
+    check_batch_size(len(params.points))
+
+    geo = state.get_geomesh()
+    try:
+        return geo.cell_id_to_value_h3_batch(
+            dataset,
+            [(p.cell, p.year, p.month, p.day) for p in params.points]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 class GeomeshShapefileArgs(BaseModel):
     shapefile: str = Field(
         description="The shapefile to use. Must be a local file on"
@@ -250,8 +321,9 @@ async def geomesh_shapefile(
 
     logger.info(f"Retrieving data shapefile, dataset:{dataset} params:{params}")
 
-    db_dir = state.get_global("database_dir")
-    geo = Geomesh(db_dir)
+    check_shapefile_size(params.shapefile)
+
+    geo = state.get_geomesh()
     try:
         return geo.shapefile_get(
             dataset,
@@ -260,7 +332,10 @@ async def geomesh_shapefile(
             params.resolution,
             params.year,
             params.month,
-            params.day
+            params.day,
+            get_max_shapefile_vertices()
         )
+    except ShapefileTooComplexException as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -9,10 +9,12 @@ from typing import Optional, List
 import logging
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
-from geomesh import Geomesh, PointDataRow
+from geomesh import PointDataRow
 from .route_constants import API_PREFIX
+from .shapefile_limits import check_shapefile_size
 import state
 
 LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
@@ -20,7 +22,9 @@ LOGGING_LEVEL = logging.INFO
 logging.basicConfig(format=LOGGING_FORMAT, level=LOGGING_LEVEL)
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# results can contain many thousands of rows, so they are encoded with
+#  orjson rather than the standard library json encoder
+router = APIRouter(default_response_class=ORJSONResponse)
 
 POINT_ENDPOINT_PREFIX = API_PREFIX + "/datasets" +  "/point"
 
@@ -55,8 +59,7 @@ async def point_latlong_radius_post(
     """
     logger.info(f"Retrieving point lat-lon radius, dataset:{dataset} params:{params}")
 
-    db_dir = state.get_global("database_dir")
-    geo = Geomesh(db_dir)
+    geo = state.get_geomesh()
     try:
         return geo.lat_long_get_radius_point(
             dataset,
@@ -102,8 +105,7 @@ async def point_cell_radius_post(
     """
     logger.info(f"Retrieving point cell radius, dataset:{dataset} params:{params}")
 
-    db_dir = state.get_global("database_dir")
-    geo = Geomesh(db_dir)
+    geo = state.get_geomesh()
     try:
         return geo.cell_get_radius_point(
             dataset,
@@ -145,8 +147,7 @@ async def point_cell_point(
 
     logger.info(f"Retrieving point cell, dataset:{dataset} params:{params}")
 
-    db_dir = state.get_global("database_dir")
-    geo = Geomesh(db_dir)
+    geo = state.get_geomesh()
     try:
         return geo.cell_id_to_value_point(
             dataset,
@@ -193,8 +194,9 @@ async def geomesh_shapefile(
 
     logger.info(f"Retrieving point shapefile, dataset:{dataset} params:{params}")
 
-    db_dir = state.get_global("database_dir")
-    geo = Geomesh(db_dir)
+    check_shapefile_size(params.shapefile)
+
+    geo = state.get_geomesh()
     try:
         return geo.shapefile_get_point(
             dataset,
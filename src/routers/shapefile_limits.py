@@ -0,0 +1,64 @@
+# Copyright 2024 Broda Group Software Inc.
+#
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+import logging
+import os
+
+from fastapi import HTTPException
+
+import state
+
+LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOGGING_LEVEL = logging.INFO
+logging.basicConfig(format=LOGGING_FORMAT, level=LOGGING_LEVEL)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SHAPEFILE_BYTES = 100 * 1024 * 1024
+DEFAULT_MAX_SHAPEFILE_VERTICES = 2_000_000
+
+
+def check_shapefile_size(shapefile: str):
+    """
+    Reject a shapefile that is too large to be processed within a
+    reasonable time, before any work is done with it. The limit may be
+    set in the server configuration as "max-bytes", under
+    "shapefile-limits".
+
+    :param shapefile: The path to the shapefile on the server
+    :type shapefile: str
+    :raises HTTPException:
+        404 if the shapefile does not exist, and 413 if it is larger
+        than the maximum size
+    """
+    max_bytes = state.get_global("shapefile_limits", {}).get(
+        "max-bytes", DEFAULT_MAX_SHAPEFILE_BYTES)
+
+    try:
+        size = os.stat(shapefile).st_size
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"shapefile {shapefile} does not exist"
+        )
+
+    if size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"shapefile is too large: {size} bytes."
+                   f" Maximum size is {max_bytes} bytes"
+        )
+
+
+def get_max_shapefile_vertices() -> int:
+    """
+    Get the maximum number of vertices a shapefile may have for its
+    h3 cells to be calculated. The limit may be set in the server
+    configuration as "max-vertices", under "shapefile-limits".
+
+    :return: The maximum number of vertices
+    :rtype: int
+    """
+    return state.get_global("shapefile_limits", {}).get(
+        "max-vertices", DEFAULT_MAX_SHAPEFILE_VERTICES)
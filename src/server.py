@@ -30,6 +30,20 @@ app = FastAPI()
 app.include_router(geomesh_router)
 app.include_router(point_router)
 
+
+@app.on_event("startup")
+def startup():
+    # A single Geomesh is shared by all requests, so that it is not set up
+    # again on every request. The server only reads the databases, so they
+    # are opened read-only, and only while a request is using them.
+    state.add_global(
+        "geomesh", Geomesh(state.get_global("database_dir"), read_only=True))
+
+
+@app.on_event("shutdown")
+def shutdown():
+    state.remove_global("geomesh")
+
 DEFAULT_CONFIG = "./config/config.yml"
 DEFAULT_HOST = "0.0.0.0"
 DEFAULT_PORT = 8000
@@ -60,6 +74,11 @@ if __name__ == "__main__":
     database_dir = configuration['database-dir']
 
     state.add_global("database_dir", database_dir)
+    # an empty limits section is loaded as None
+    state.add_global(
+        "shapefile_limits", configuration.get("shapefile-limits") or {})
+    state.add_global(
+        "batch_limits", configuration.get("batch-limits") or {})
 
     uvicorn.run(app, host=host, port=port)
 
@@ -11,9 +11,10 @@ from typing import Optional, Set, Tuple, List
 import geopandas
 import h3
 import numpy as np
+import shapely
 from geopandas import GeoDataFrame
 from pandas import Series
-from shapely import Polygon, MultiPolygon, Point
+from shapely import Polygon, MultiPolygon, Point, box
 from shapely.geometry import shape
 from shapely.geometry.base import BaseGeometry
 
@@ -22,6 +23,11 @@ LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 logging.basicConfig(level=logging.INFO, format=LOGGING_FORMAT)
 logger = logging.getLogger(__name__)
 
+# Number of decimal places coordinates are snapped to before tessellation.
+# Five decimal places of a degree is about one meter, far finer than any
+# h3 resolution coverage is affected by.
+H3_COORDINATE_DECIMALS = 5
+
 
 class Shape:
 
@@ -191,12 +197,61 @@ class Shape:
         if tolerance < 0:
             raise ValueError("Tolerance must be non-negative.")
 
-        self.gdf["geometry"] = self.gdf["geometry"].simplify(
-            tolerance,
-            preserve_topology=True
-        )
+        self._simplify_geometries(tolerance)
         return self.statistics()
 
+    def simplify_for_h3(
+            self,
+            tolerance: float,
+            decimals: int = H3_COORDINATE_DECIMALS
+    ) -> None:
+        """
+        Reduce the number of vertices in the shapefile before it is converted
+        into h3 cells. Polygons are simplified with the given tolerance, and
+        their coordinates snapped to the given number of decimal places.
+        Unlike simplify, no statistics are calculated.
+
+        :param tolerance:
+            The simplification tolerance, in the units of the shapefile's
+            coordinate system. No simplification is done if this is 0.
+        :type tolerance: float
+        :param decimals: The number of decimal places to snap coordinates to
+        :type decimals: int
+        :return: no return value
+        :rtype: None
+        """
+        logger.info(f"Simplifying for h3 tolerance:{tolerance}"
+                    f" decimals:{decimals}")
+
+        if tolerance < 0:
+            raise ValueError("Tolerance must be non-negative.")
+
+        if tolerance > 0:
+            self._simplify_geometries(tolerance)
+
+        self.gdf["geometry"] = shapely.set_precision(
+            self.gdf["geometry"].values.to_numpy(),
+            grid_size=10 ** -decimals
+        )
+
+    def count_vertices(self, region: Optional[str] = None) -> int:
+        """
+        Count the vertices of the geometries in the shapefile
+
+        :param region:
+            The region in the shapefile to count vertices for. If absent
+            every region in the shapefile will be counted.
+        :type region: Optional[str]
+        :return: The total number of vertices
+        :rtype: int
+        """
+        if region is not None:
+            gdf = self.gdf[self.gdf.name == region]
+        else:
+            gdf = self.gdf
+        return int(shapely.get_num_coordinates(
+            gdf["geometry"].values.to_numpy()).sum())
+
     def buffer(self, distance: float, units: str):
         """
         Create a buffer of a distance in the provided units
@@ -300,17 +355,21 @@ class Shape:
             min_latitude: Optional[float] = None,
             max_latitude: Optional[float] = None,
     ) -> Set[str]:
+        gdf = self.gdf
+        if region is not None:
+            gdf = gdf[gdf.name == region]
+
+        # buffer the extent so that polygons just outside of it, which
+        # still contribute cells once buffered, are not pruned
         gdf = self._filter_lat_long(
-            self.gdf,
+            gdf,
             min_longitude,
             max_longitude,
             min_latitude,
-            max_latitude
+            max_latitude,
+            buffer
         )
 
-        if region is not None:
-            gdf = gdf[gdf.name == region]
-
         if reverse_coords:
             gdf = gdf['geometry'].apply(self._reverse_coordinates)
 
@@ -374,6 +433,12 @@ class Shape:
                 break
         return contained
 
+    def _simplify_geometries(self, tolerance: float):
+        self.gdf["geometry"] = self.gdf["geometry"].simplify(
+            tolerance,
+            preserve_topology=True
+        )
+
     def _fix_invalid_geometries(self, gdf):
         """
         Fixes invalid geometries in a GeoDataFrame.
@@ -435,34 +500,45 @@ class Shape:
             max_longitude: Optional[float] = None,
             min_latitude: Optional[float] = None,
             max_latitude: Optional[float] = None,
+            buffer: float = 0
     ) -> GeoDataFrame:
-        out_geo = gdf
-
-        if min_longitude is not None:
-            if min_longitude > 180 or min_longitude < -180:
-                raise ValueError(
-                    "minimum longitude must be in range [-180, 180]")
-            out_geo = gdf.cx[min_longitude:, :]
-
-        if max_longitude is not None:
-            if max_longitude > 180 or max_longitude < -180:
-                raise ValueError(
-                    "maximum longitude must be in range [-180, 180]")
-            out_geo = gdf.cx[:max_longitude, :]
-
-        if min_latitude is not None:
-            if min_latitude > 90 or min_latitude < -90:
-                raise ValueError(
-                    "minimum latitude must be in range [-90, 90]")
-            out_geo = gdf.cx[:, min_latitude:]
-
-        if max_latitude is not None:
-            if max_latitude > 90 or max_latitude < -90:
-                raise ValueError(
-                    "maximum latitude must be in range [-90, 90]")
-            out_geo = gdf.cx[:, :max_latitude]
-
-        return out_geo
+        """
+        Prune every geometry whose bounding box does not intersect the
+        specified extent, using the spatial index of the GeoDataFrame.
+        Missing bounds default to the full range of longitudes/latitudes.
+        """
+        if min_longitude is not None and \
+                (min_longitude > 180 or min_longitude < -180):
+            raise ValueError(
+                "minimum longitude must be in range [-180, 180]")
+
+        if max_longitude is not None and \
+                (max_longitude > 180 or max_longitude < -180):
+            raise ValueError(
+                "maximum longitude must be in range [-180, 180]")
+
+        if min_latitude is not None and \
+                (min_latitude > 90 or min_latitude < -90):
+            raise ValueError(
+                "minimum latitude must be in range [-90, 90]")
+
+        if max_latitude is not None and \
+                (max_latitude > 90 or max_latitude < -90):
+            raise ValueError(
+                "maximum latitude must be in range [-90, 90]")
+
+        if min_longitude is None and max_longitude is None \
+                and min_latitude is None and max_latitude is None:
+            return gdf
+
+        extent = box(
+            (-180 if min_longitude is None else min_longitude) - buffer,
+            (-90 if min_latitude is None else min_latitude) - buffer,
+            (180 if max_longitude is None else max_longitude) + buffer,
+            (90 if max_latitude is None else max_latitude) + buffer
+        )
+        candidates = gdf.sindex.query(extent)
+        return gdf.iloc[np.sort(candidates)]
 
     def _reverse_coordinates(self, shape):
         # Swap the coordinates from (lon, lat) to (lat, lon)
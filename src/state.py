@@ -13,8 +13,16 @@ global_state = {}
 def add_global(key: str, val: Any):
     global_state[key] = val
 
-def get_global(key: str) -> Any:
+_NO_DEFAULT = object()
+
+def get_global(key: str, default: Any = _NO_DEFAULT) -> Any:
+    if default is not _NO_DEFAULT:
+        return global_state.get(key, default)
     return global_state[key]
 
 def remove_global(key: str):
     del global_state[key]
+
+def get_geomesh():
+    """Get the Geomesh instance shared by all requests to the server"""
+    return global_state["geomesh"]
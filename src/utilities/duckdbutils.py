@@ -5,7 +5,7 @@
 # https://opensource.org/licenses/MIT.
 #
 # Created: 2024-03-08 by davis.broda@brodagroupsoftware.com
-from typing import Dict, Tuple, Optional
+from typing import Tuple, Optional
 
 import duckdb
 
@@ -72,6 +72,13 @@ TYPE_ALIASES = {
     "STRING": "VARCHAR"
 }
 
+# mapping of every accepted general purpose type name,
+#  including aliases -> CANNONICAL TYPE
+CANNONICAL_GENERAL_TYPES = {
+    **{t: t for t in GENERAL_PURPOSE_DATA_TYPES},
+    **TYPE_ALIASES
+}
+
 
 def duckdb_check_table_exists(
         connection: duckdb.DuckDBPyConnection,
@@ -87,63 +94,37 @@ def duckdb_check_table_exists(
     :return: True if table exists, Falst otherwise
     :rtype: bool
     """
-    cur = connection.cursor()
     sql = """
         SELECT COUNT(*) FROM information_schema.tables
         WHERE table_name = ?
     """
-    res = cur.execute(sql, [tablename]).fetchone()
-    if res[0] > 0:
-        cur.close()
-        return True
-    else:
-        cur.close()
-        return False
+    with connection.cursor() as cur:
+        res = cur.execute(sql, [tablename]).fetchone()
+    return res[0] > 0
 
 
-def is_general_col_type(col_type:str) -> Tuple[bool, Optional[str]]:
+def to_cannonical_general_type(
+        col_type: str
+) -> Tuple[Optional[str], Optional[str]]:
     """
-    Determines whether a given column type is a valid general purpose
-    type available to duckdb.
+    Validates that a column type is a general purpose type available to
+    duckdb, and converts it to its cannonical name, in a single lookup.
 
-    :param col_type: Column type to validate
-    :type col_type: Dict[str,str]
+    :param col_type: Column type to validate and convert
+    :type col_type: str
     :return:
         A tuple of two values:
-            1st: true if type is valid, false if invalid
-            2nd: empty if type is valid, an error message if invalid
-    :rtype: Tuple[bool, str]
+            1st: the cannonical type if valid, None if invalid
+            2nd: None if type is valid, an error message if invalid
+    :rtype: Tuple[Optional[str], Optional[str]]
     """
-    is_valid = False
-    errmsg = None
-
-    type_upper = col_type.upper()
-
-    if type_upper in GENERAL_PURPOSE_DATA_TYPES:
-        is_valid = True
-    elif type_upper in COMPOSITE_TYPES:
-        is_valid = False
-        errmsg = f"column type is composite, not general purpose: {col_type}"
-    elif type_upper in TYPE_ALIASES.keys():
-        is_valid = True
-    else:
-        is_valid = False
-        errmsg = f"unrecognized type: {col_type}"
-
-    return is_valid, errmsg
-
-
-def convert_to_cannonical_type(col_type: str) -> str:
     type_upper = col_type.upper()
 
-    if type_upper in GENERAL_PURPOSE_DATA_TYPES:
-        out = type_upper
+    cannonical = CANNONICAL_GENERAL_TYPES.get(type_upper)
+    if cannonical is not None:
+        return cannonical, None
     elif type_upper in COMPOSITE_TYPES:
-        out = type_upper
-    elif type_upper in TYPE_ALIASES.keys():
-        out = TYPE_ALIASES[type_upper]
+        return None, \
+            f"column type is composite, not general purpose: {col_type}"
     else:
-        raise ValueError(
-            f"column type: {col_type} is not a known duckdb type")
-
-    return out
\ No newline at end of file
+        return None, f"unrecognized type: {col_type}"
@@ -17,7 +17,8 @@ logger = logging.getLogger(__name__)
 
 def httprequest(host: str, port: int, service: str, method: str,
              data: Optional[Any]=None, obj: Optional[Dict]=None,
-             files: Optional[Any]=None, params: Optional[Dict]=None) -> requests.Response:
+             files: Optional[Any]=None, params: Optional[Dict]=None,
+             session: Optional[requests.Session]=None) -> requests.Response:
     """
     Generic request function using the requests library.
     On success, a True boolean is returned.
@@ -33,6 +34,9 @@ def httprequest(host: str, port: int, service: str, method: str,
     - data (any, optional): Data to send in the request body, typically for POST requests
     - obj (dict, optional): JSON object to send in the request body
     - files (any, optional): Files to send in the request body
+    - session (requests.Session, optional): Session to issue the request
+      with, allowing pooled connections to be reused across requests.
+      If not provided, a new connection is opened for this request
 
     Returns:
     - requests.Response: The response object
@@ -52,17 +56,19 @@ def httprequest(host: str, port: int, service: str, method: str,
         if method not in ["GET", "POST", "PUT", "DELETE"]:
             raise ValueError(f"Invalid HTTP method:{method}")
 
+        requester = session if session is not None else requests
+
         if method == "GET":
-            response = requests.get(url, params=params, headers=headers)
+            response = requester.get(url, params=params, headers=headers)
         elif method == "POST":
             if files:
-                response = requests.post(url, data=data, json=obj, files=files, headers=headers)
+                response = requester.post(url, data=data, json=obj, files=files, headers=headers)
             else:
-                response = requests.post(url, data=data, json=obj, headers=headers)
+                response = requester.post(url, data=data, json=obj, headers=headers)
         elif method == "PUT":
-            response = requests.put(url, data=data, json=obj, headers=headers)
+            response = requester.put(url, data=data, json=obj, headers=headers)
         elif method == "DELETE":
-            response = requests.delete(url, headers=headers)
+            response = requester.delete(url, headers=headers)
 
         if response.status_code != 200:
             import json
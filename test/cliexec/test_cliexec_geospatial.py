@@ -0,0 +1,70 @@
+# Copyright 2024 Broda Group Software Inc.
+#
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+import threading
+import time
+import unittest
+from unittest import mock
+
+import cliexec_geospatial
+from cliexec_geospatial import CliExecGeospatial, MAX_CONCURRENT_REQUESTS
+
+
+class TestCliExecGeospatial(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cliexec = CliExecGeospatial({"host": "localhost", "port": 8000})
+
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # thread ident -> sessions used by that thread
+        self.sessions = {}
+
+    def tearDown(self) -> None:
+        self.cliexec.close()
+
+    def _fake_httprequest(self, host, port, service, method,
+                          obj=None, session=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.sessions.setdefault(
+                threading.get_ident(), set()).add(id(session))
+        # hold the request open long enough for the others to start
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        return [obj["latitude"], obj["longitude"]]
+
+    def _show_many(self, num_points: int):
+        points = [{"latitude": i, "longitude": -i, "resolution": 2}
+                  for i in range(num_points)]
+        with mock.patch.object(
+                cliexec_geospatial.httputils, "httprequest",
+                side_effect=self._fake_httprequest):
+            return self.cliexec.show_many_latlong_point("ds", points)
+
+    def test_results_in_input_order(self):
+        results = self._show_many(100)
+
+        self.assertEqual([[i, -i] for i in range(100)], results)
+
+    def test_concurrent_requests_capped(self):
+        self._show_many(MAX_CONCURRENT_REQUESTS * 4)
+
+        self.assertGreater(self.max_in_flight, 1)
+        self.assertLessEqual(self.max_in_flight, MAX_CONCURRENT_REQUESTS)
+
+    def test_session_per_thread(self):
+        self._show_many(MAX_CONCURRENT_REQUESTS * 4)
+
+        for thread_sessions in self.sessions.values():
+            self.assertEqual(1, len(thread_sessions))
+        all_sessions = set().union(*self.sessions.values())
+        self.assertEqual(len(self.sessions), len(all_sessions))
+
+    def test_empty_points(self):
+        self.assertEqual([], self._show_many(0))
@@ -0,0 +1,231 @@
+# Copyright 2024 Broda Group Software Inc.
+#
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+import gc
+import os
+import shutil
+import time
+import unittest
+
+import duckdb
+import h3
+from fastapi.testclient import TestClient
+
+import state
+from geomesh import Geomesh
+from metadata import MetadataDB, clear_metadata_cache
+from server import app
+
+DATASET_NAME = "batch_ds"
+
+# (latitude, longitude, year, value) of each row loaded into the dataset
+DATA_POINTS = [
+    (10.0, 10.0, 2020, 1.0),
+    (10.0, 10.0, 2021, 2.0),
+    (40.0, -100.0, 2020, 3.0),
+    (-30.0, 140.0, 2021, 4.0),
+]
+RESOLUTIONS = [0, 1]
+
+
+class TestGeomeshBatch(unittest.TestCase):
+    tmp_folder = "./test/test_data/geomesh/tmp"
+
+    def setUp(self) -> None:
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+        os.makedirs(self.tmp_folder)
+        self.database_dir = self.tmp_folder
+        clear_metadata_cache()
+
+        db_path = os.path.join(self.database_dir, f"{DATASET_NAME}.duckdb")
+        connection = duckdb.connect(db_path)
+        for res in RESOLUTIONS:
+            connection.execute(
+                f"CREATE TABLE {DATASET_NAME}_{res} (cell VARCHAR,"
+                f" latitude DOUBLE, longitude DOUBLE, value DOUBLE,"
+                f" year INTEGER)"
+            )
+            for lat, long, year, value in DATA_POINTS:
+                cell = h3.geo_to_h3(lat, long, res)
+                clat, clong = h3.h3_to_geo(cell)
+                connection.execute(
+                    f"INSERT INTO {DATASET_NAME}_{res} VALUES (?,?,?,?,?)",
+                    [cell, clat, clong, value, year]
+                )
+        connection.close()
+
+        metadb = MetadataDB(self.database_dir)
+        metadb.add_metadata_entry(
+            DATASET_NAME, "batch test", {"value": "double"}, "yearly", "h3")
+
+        self.geo = Geomesh(self.database_dir)
+        state.add_global("batch_limits", {})
+
+    def tearDown(self) -> None:
+        state.remove_global("batch_limits")
+        clear_metadata_cache()
+        # needed as databases only release lock on files when garbage collected
+        #  without this, the delete operation will fail due to file locks
+        gc.collect()
+        time.sleep(0.1)
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+
+    def _single(self, cell, year):
+        return self.geo.cell_id_to_value_h3(
+            DATASET_NAME, cell, year, None, None)
+
+    def test_matches_single_lookups_across_groups(self):
+        queries = []
+        for res in RESOLUTIONS:
+            for lat, long, year, _ in DATA_POINTS:
+                queries.append((h3.geo_to_h3(lat, long, res), year, None, None))
+
+        batch = self.geo.cell_id_to_value_h3_batch(DATASET_NAME, queries)
+
+        self.assertEqual(len(queries), len(batch))
+        for (cell, year, _, _), result in zip(queries, batch):
+            self.assertEqual(self._single(cell, year), result)
+
+    def test_time_filter_is_applied_per_query(self):
+        cell = h3.geo_to_h3(10.0, 10.0, 1)
+
+        batch = self.geo.cell_id_to_value_h3_batch(
+            DATASET_NAME,
+            [(cell, 2021, None, None), (cell, 2020, None, None)]
+        )
+
+        self.assertEqual(2.0, batch[0][0].values["value"])
+        self.assertEqual(1.0, batch[1][0].values["value"])
+
+    def test_preserves_input_order(self):
+        cells = [h3.geo_to_h3(lat, long, 1) for lat, long, _, _ in DATA_POINTS]
+        queries = [(cells[3], 2021, None, None),
+                   (h3.geo_to_h3(40.0, -100.0, 0), 2020, None, None),
+                   (cells[2], 2020, None, None),
+                   (cells[0], 2020, None, None)]
+
+        batch = self.geo.cell_id_to_value_h3_batch(DATASET_NAME, queries)
+
+        self.assertEqual(
+            [q[0] for q in queries],
+            [result[0].cell for result in batch]
+        )
+        self.assertEqual(
+            [4.0, 3.0, 3.0, 1.0],
+            [result[0].values["value"] for result in batch]
+        )
+
+    def test_duplicate_queries(self):
+        cell = h3.geo_to_h3(40.0, -100.0, 1)
+
+        batch = self.geo.cell_id_to_value_h3_batch(
+            DATASET_NAME,
+            [(cell, 2020, None, None), (cell, 2020, None, None)]
+        )
+
+        self.assertEqual(2, len(batch))
+        self.assertEqual(batch[0], batch[1])
+        self.assertEqual(1, len(batch[0]))
+
+    def test_missing_cell_returns_empty(self):
+        present = h3.geo_to_h3(10.0, 10.0, 1)
+        missing = h3.geo_to_h3(-80.0, 0.0, 1)
+
+        batch = self.geo.cell_id_to_value_h3_batch(
+            DATASET_NAME,
+            [(missing, 2020, None, None),
+             (present, 2020, None, None),
+             (present, 1999, None, None)]
+        )
+
+        self.assertEqual([], batch[0])
+        self.assertEqual(1, len(batch[1]))
+        self.assertEqual([], batch[2])
+
+    def test_empty_queries(self):
+        self.assertEqual(
+            [], self.geo.cell_id_to_value_h3_batch(DATASET_NAME, []))
+        self.assertEqual(
+            [], self.geo.lat_long_to_value_batch(DATASET_NAME, []))
+
+    def test_lat_long_matches_cell_lookup(self):
+        points = [(lat, long, res, year, None, None)
+                  for res in RESOLUTIONS
+                  for lat, long, year, _ in DATA_POINTS]
+
+        batch = self.geo.lat_long_to_value_batch(DATASET_NAME, points)
+
+        for (lat, long, res, year, _, _), result in zip(points, batch):
+            self.assertEqual(
+                self._single(h3.geo_to_h3(lat, long, res), year), result)
+
+    def test_unknown_dataset(self):
+        with self.assertRaises(Exception):
+            self.geo.cell_id_to_value_h3_batch("not_a_dataset", [])
+
+    def test_batch_routes(self):
+        state.add_global("database_dir", self.database_dir)
+        cell = h3.geo_to_h3(40.0, -100.0, 1)
+        missing = h3.geo_to_h3(-80.0, 0.0, 1)
+
+        with TestClient(app) as client:
+            cell_resp = client.post(
+                f"/api/geomesh/cell/point/batch/{DATASET_NAME}",
+                json={"points": [
+                    {"cell": missing, "year": 2020},
+                    {"cell": cell, "year": 2020}
+                ]}
+            )
+            latlong_resp = client.post(
+                f"/api/geomesh/latlong/point/batch/{DATASET_NAME}",
+                json={"points": [
+                    {"latitude": 40.0, "longitude": -100.0,
+                     "resolution": 1, "year": 2020}
+                ]}
+            )
+            empty_resp = client.post(
+                f"/api/geomesh/cell/point/batch/{DATASET_NAME}",
+                json={"points": []}
+            )
+
+        self.assertEqual(200, cell_resp.status_code)
+        body = cell_resp.json()
+        self.assertEqual([], body[0])
+        self.assertEqual(cell, body[1][0]["cell"])
+        self.assertEqual(3.0, body[1][0]["values"]["value"])
+
+        self.assertEqual(200, latlong_resp.status_code)
+        self.assertEqual(cell, latlong_resp.json()[0][0]["cell"])
+
+        self.assertEqual(200, empty_resp.status_code)
+        self.assertEqual([], empty_resp.json())
+
+    def test_batch_routes_reject_too_many_points(self):
+        state.add_global("database_dir", self.database_dir)
+        state.add_global("batch_limits", {"max-points": 1})
+        cell = h3.geo_to_h3(40.0, -100.0, 1)
+        cell_point = {"cell": cell, "year": 2020}
+        latlong_point = {"latitude": 40.0, "longitude": -100.0,
+                         "resolution": 1, "year": 2020}
+
+        with TestClient(app) as client:
+            cell_resp = client.post(
+                f"/api/geomesh/cell/point/batch/{DATASET_NAME}",
+                json={"points": [cell_point, cell_point]}
+            )
+            latlong_resp = client.post(
+                f"/api/geomesh/latlong/point/batch/{DATASET_NAME}",
+                json={"points": [latlong_point, latlong_point]}
+            )
+            within_limit_resp = client.post(
+                f"/api/geomesh/cell/point/batch/{DATASET_NAME}",
+                json={"points": [cell_point]}
+            )
+
+        self.assertEqual(413, cell_resp.status_code)
+        self.assertEqual(413, latlong_resp.status_code)
+        self.assertEqual(200, within_limit_resp.status_code)
@@ -0,0 +1,132 @@
+# Copyright 2024 Broda Group Software Inc.
+#
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+import gc
+import os
+import shutil
+import time
+import unittest
+from unittest import mock
+
+import geopandas
+from shapely import box
+
+import geomesh
+from geomesh import Geomesh
+
+
+class TestGeomeshCoverCache(unittest.TestCase):
+    tmp_folder = "./test/test_data/geomesh/cover_tmp"
+
+    def setUp(self) -> None:
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+        os.makedirs(self.tmp_folder)
+        self.database_dir = os.path.join(self.tmp_folder, "databases")
+        self.shapefile = os.path.join(self.tmp_folder, "test.shp")
+        self._write_shapefile(["a", "b"])
+        self.geo = Geomesh(self.database_dir)
+
+    def tearDown(self) -> None:
+        # needed as databases only release lock on files when garbage collected
+        #  without this, the delete operation will fail due to file locks
+        gc.collect()
+        time.sleep(0.1)
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+
+    def _write_shapefile(self, names):
+        gdf = geopandas.GeoDataFrame(
+            {"name": names},
+            geometry=[box(0, 0, 10, 10), box(40, 0, 50, 10)],
+            crs="EPSG:4326"
+        )
+        gdf.to_file(self.shapefile)
+
+    def test_hit_returns_same_cells_as_miss(self):
+        cache_path = self.geo._get_cover_cache_path(self.shapefile, "a", 2)
+        self.assertFalse(os.path.exists(cache_path))
+
+        miss_cells = self.geo._get_shapefile_cells(self.shapefile, "a", 2)
+        self.assertTrue(os.path.exists(cache_path))
+
+        with mock.patch.object(geomesh.shape, "Shape") as shape_class:
+            hit_cells = self.geo._get_shapefile_cells(self.shapefile, "a", 2)
+
+        shape_class.assert_not_called()
+        self.assertGreater(len(miss_cells), 0)
+        self.assertEqual(len(miss_cells), len(hit_cells))
+        self.assertEqual(set(miss_cells), set(hit_cells))
+
+    def test_whole_shapefile_cached(self):
+        miss_cells = self.geo._get_shapefile_cells(self.shapefile, None, 1)
+        hit_cells = self.geo._get_shapefile_cells(self.shapefile, None, 1)
+
+        self.assertEqual(set(miss_cells), set(hit_cells))
+        self.assertTrue(
+            set(self.geo._get_shapefile_cells(self.shapefile, "a", 1))
+            < set(hit_cells)
+        )
+
+    def test_key_is_stable(self):
+        self.assertEqual(
+            self.geo._get_cover_cache_path(self.shapefile, "a", 2),
+            self.geo._get_cover_cache_path(self.shapefile, "a", 2)
+        )
+
+    def test_key_changes_with_region(self):
+        path_a = self.geo._get_cover_cache_path(self.shapefile, "a", 2)
+        path_b = self.geo._get_cover_cache_path(self.shapefile, "b", 2)
+        path_all = self.geo._get_cover_cache_path(self.shapefile, None, 2)
+        path_none_name = self.geo._get_cover_cache_path(
+            self.shapefile, "None", 2)
+
+        self.assertEqual(4, len({path_a, path_b, path_all, path_none_name}))
+
+    def test_key_changes_with_resolution(self):
+        self.assertNotEqual(
+            self.geo._get_cover_cache_path(self.shapefile, "a", 1),
+            self.geo._get_cover_cache_path(self.shapefile, "a", 2)
+        )
+
+    def test_key_changes_when_dbf_edited(self):
+        before = self.geo._get_cover_cache_path(self.shapefile, "a", 2)
+        with open(self.shapefile, "rb") as file:
+            shp_contents = file.read()
+
+        # swap the region names, leaving the geometry unchanged
+        self._write_shapefile(["b", "a"])
+        with open(self.shapefile, "rb") as file:
+            self.assertEqual(shp_contents, file.read())
+
+        self.assertNotEqual(
+            before, self.geo._get_cover_cache_path(self.shapefile, "a", 2))
+
+    def test_failed_cache_write_still_returns_cells(self):
+        cache_dir = os.path.join(self.database_dir, geomesh.H3_COVER_CACHE_DIR)
+        expected = set(self.geo._get_shapefile_cells(self.shapefile, "a", 2))
+        shutil.rmtree(cache_dir)
+
+        with mock.patch.object(
+                geomesh.numpy, "save", side_effect=OSError("disk full")):
+            with self.assertLogs(geomesh.logger, level="WARNING"):
+                cells = self.geo._get_shapefile_cells(self.shapefile, "a", 2)
+
+        self.assertEqual(expected, set(cells))
+        self.assertEqual([], os.listdir(cache_dir))
+
+    def test_oldest_coverings_evicted(self):
+        with mock.patch.object(geomesh, "H3_COVER_CACHE_MAX_FILES", 2):
+            for resolution in [0, 1, 2]:
+                self.geo._get_shapefile_cells(self.shapefile, "a", resolution)
+                # so that every covering has a distinct modification time
+                time.sleep(0.05)
+
+        self.assertFalse(os.path.exists(
+            self.geo._get_cover_cache_path(self.shapefile, "a", 0)))
+        for resolution in [1, 2]:
+            self.assertTrue(os.path.exists(
+                self.geo._get_cover_cache_path(
+                    self.shapefile, "a", resolution)))
@@ -0,0 +1,202 @@
+# Copyright 2024 Broda Group Software Inc.
+#
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+import gc
+import os
+import shutil
+import time
+import unittest
+from unittest import mock
+
+import metadata
+from metadata import MetadataDB
+
+
+class TestMetadataDB(unittest.TestCase):
+    tmp_folder = "./test/test_data/metadata/tmp"
+
+    def setUp(self) -> None:
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+        os.makedirs(self.tmp_folder)
+        metadata.clear_metadata_cache()
+        self.metadb = MetadataDB(self.tmp_folder)
+
+    def tearDown(self) -> None:
+        metadata.clear_metadata_cache()
+        # needed as databases only release lock on files when garbage collected
+        #  without this, the delete operation will fail due to file locks
+        gc.collect()
+        time.sleep(0.1)
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+
+    def test_add_and_get_metadata(self):
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+
+        meta = self.metadb.get_ds_metadata("ds1")
+
+        self.assertEqual("ds1", meta["dataset_name"])
+        self.assertEqual("a dataset", meta["description"])
+        self.assertEqual(
+            {"key": ["val"], "value": ["INTEGER"]}, meta["value_columns"])
+        self.assertEqual("yearly", meta["interval"])
+        self.assertEqual("h3", meta["dataset_type"])
+
+    def test_add_metadata_does_not_modify_value_columns(self):
+        value_columns = {"val": "int", "name": "text"}
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", value_columns, "yearly", "h3")
+
+        self.assertEqual({"val": "int", "name": "text"}, value_columns)
+        self.assertEqual(
+            {"key": ["val", "name"], "value": ["INTEGER", "VARCHAR"]},
+            self.metadb.get_ds_metadata("ds1")["value_columns"]
+        )
+
+    def test_ds_meta_exists(self):
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+
+        self.assertTrue(self.metadb.ds_meta_exists("ds1"))
+        self.assertFalse(self.metadb.ds_meta_exists("ds2"))
+
+    def test_show_meta_lists_all_entries(self):
+        self.metadb.add_metadata_entry(
+            "ds1", "first", {"val": "int"}, "yearly", "h3")
+        self.metadb.add_metadata_entry(
+            "ds2", None, {"val": "double"}, "one_time", "point")
+
+        names = [m["dataset_name"] for m in self.metadb.show_meta()]
+
+        self.assertEqual(["ds1", "ds2"], sorted(names))
+
+    def test_exception_on_missing_table(self):
+        self.assertRaises(ValueError, self.metadb.show_meta)
+        self.assertRaises(ValueError, self.metadb.ds_meta_exists, "ds1")
+
+    def test_table_created_after_failed_check(self):
+        self.assertRaises(ValueError, self.metadb.ds_meta_exists, "ds1")
+
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+
+        self.assertTrue(self.metadb.ds_meta_exists("ds1"))
+
+    def test_table_created_by_other_instance(self):
+        self.assertRaises(ValueError, self.metadb.ds_meta_exists, "ds1")
+
+        other = MetadataDB(self.tmp_folder)
+        other.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+
+        self.assertTrue(self.metadb.ds_meta_exists("ds1"))
+
+    def test_exception_on_duplicate_dataset(self):
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+        self.assertRaises(
+            ValueError,
+            self.metadb.add_metadata_entry,
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3"
+        )
+
+    def test_exception_on_non_alphanumeric_column(self):
+        self.assertRaises(
+            ValueError,
+            self.metadb.add_metadata_entry,
+            "ds1", "a dataset", {"val-1": "int"}, "yearly", "h3"
+        )
+
+    def test_exception_on_invalid_column_type(self):
+        self.assertRaises(
+            ValueError,
+            self.metadb.add_metadata_entry,
+            "ds1", "a dataset", {"val": "notatype"}, "yearly", "h3"
+        )
+
+    def test_exception_on_invalid_interval(self):
+        self.assertRaises(
+            ValueError,
+            self.metadb.add_metadata_entry,
+            "ds1", "a dataset", {"val": "int"}, "hourly", "h3"
+        )
+
+    def test_exception_on_invalid_dataset_type(self):
+        self.assertRaises(
+            ValueError,
+            self.metadb.add_metadata_entry,
+            "ds1", "a dataset", {"val": "int"}, "yearly", "polygon"
+        )
+
+    def test_read_only_reads_entries(self):
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+        self.metadb = MetadataDB(self.tmp_folder, read_only=True)
+
+        self.assertTrue(self.metadb.ds_meta_exists("ds1"))
+        self.assertEqual(
+            ["ds1"], [m["dataset_name"] for m in self.metadb.show_meta()])
+
+    def test_read_only_sees_entries_added_later(self):
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+        reader = MetadataDB(self.tmp_folder, read_only=True)
+        self.assertTrue(reader.ds_meta_exists("ds1"))
+
+        # the reader holds no lock between operations, so entries can
+        #  still be added while it is in use
+        self.metadb.add_metadata_entry(
+            "ds2", "another dataset", {"val": "int"}, "yearly", "h3")
+
+        self.assertTrue(reader.ds_meta_exists("ds2"))
+
+    def test_read_only_rejects_add(self):
+        self.metadb = MetadataDB(self.tmp_folder, read_only=True)
+
+        self.assertRaises(
+            ValueError,
+            self.metadb.add_metadata_entry,
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3"
+        )
+
+    def test_read_only_creates_missing_database(self):
+        empty_dir = os.path.join(self.tmp_folder, "empty")
+
+        meta = MetadataDB(empty_dir, read_only=True)
+
+        self.assertRaises(ValueError, meta.show_meta)
+
+    def test_metadata_served_from_cache(self):
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+        expected = self.metadb.get_ds_metadata("ds1")
+
+        with mock.patch.object(MetadataDB, "_connect") as connect:
+            self.assertTrue(self.metadb.ds_meta_exists("ds1"))
+            self.assertEqual(expected, self.metadb.get_ds_metadata("ds1"))
+
+        connect.assert_not_called()
+
+    def test_cache_cleared_on_add(self):
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+        self.metadb.get_ds_metadata("ds1")
+
+        self.metadb.add_metadata_entry(
+            "ds2", "another dataset", {"val": "int"}, "yearly", "h3")
+
+        self.assertIsNone(
+            metadata._get_cached_metadata(self.tmp_folder, "ds1"))
+
+    def test_cache_entry_expires(self):
+        self.metadb.add_metadata_entry(
+            "ds1", "a dataset", {"val": "int"}, "yearly", "h3")
+        self.metadb.get_ds_metadata("ds1")
+
+        with mock.patch.object(metadata, "METADATA_CACHE_TTL_SECONDS", -1):
+            self.assertIsNone(
+                metadata._get_cached_metadata(self.tmp_folder, "ds1"))
@@ -0,0 +1,160 @@
+# Copyright 2024 Broda Group Software Inc.
+#
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+import gc
+import os
+import shutil
+import time
+import unittest
+
+import duckdb
+import geopandas
+import h3
+from fastapi.testclient import TestClient
+from shapely import box
+
+import state
+from metadata import MetadataDB, clear_metadata_cache
+from server import app
+
+DATASET_NAME = "limits_ds"
+RESOLUTION = 1
+SHAPEFILE_ENDPOINT = f"/api/geomesh/shapefile/{DATASET_NAME}"
+POINT_SHAPEFILE_ENDPOINT = f"/api/datasets/point/shapefile/{DATASET_NAME}"
+
+
+class TestShapefileLimits(unittest.TestCase):
+    tmp_folder = "./test/test_data/routers/tmp"
+
+    def setUp(self) -> None:
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+        os.makedirs(self.tmp_folder)
+        self.database_dir = os.path.join(self.tmp_folder, "databases")
+        os.makedirs(self.database_dir)
+        clear_metadata_cache()
+
+        self.shapefile = os.path.join(self.tmp_folder, "test.shp")
+        # 2 boxes of 5 vertices each
+        geopandas.GeoDataFrame(
+            {"name": ["a", "b"]},
+            geometry=[box(0, 0, 10, 10), box(40, 0, 50, 10)],
+            crs="EPSG:4326"
+        ).to_file(self.shapefile)
+
+        db_path = os.path.join(self.database_dir, f"{DATASET_NAME}.duckdb")
+        connection = duckdb.connect(db_path)
+        connection.execute(
+            f"CREATE TABLE {DATASET_NAME}_{RESOLUTION} (cell VARCHAR,"
+            f" latitude DOUBLE, longitude DOUBLE, value DOUBLE)"
+        )
+        cell = h3.geo_to_h3(5.0, 5.0, RESOLUTION)
+        latitude, longitude = h3.h3_to_geo(cell)
+        connection.execute(
+            f"INSERT INTO {DATASET_NAME}_{RESOLUTION} VALUES (?,?,?,?)",
+            [cell, latitude, longitude, 1.0]
+        )
+        connection.close()
+
+        metadb = MetadataDB(self.database_dir)
+        metadb.add_metadata_entry(
+            DATASET_NAME, "limits test", {"value": "double"}, "one_time", "h3")
+
+        state.add_global("database_dir", self.database_dir)
+        state.add_global("shapefile_limits", {})
+
+    def tearDown(self) -> None:
+        state.remove_global("shapefile_limits")
+        clear_metadata_cache()
+        # needed as databases only release lock on files when garbage collected
+        #  without this, the delete operation will fail due to file locks
+        gc.collect()
+        time.sleep(0.1)
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+
+    def _post(self, endpoint: str, shapefile: str, limits: dict,
+              region: str = None):
+        state.add_global("shapefile_limits", limits)
+        body = {"shapefile": shapefile, "resolution": RESOLUTION}
+        if region is not None:
+            body["region"] = region
+        with TestClient(app) as client:
+            return client.post(endpoint, json=body)
+
+    def test_within_default_limits(self):
+        resp = self._post(SHAPEFILE_ENDPOINT, self.shapefile, {})
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(
+            [h3.geo_to_h3(5.0, 5.0, RESOLUTION)],
+            [row["cell"] for row in resp.json()]
+        )
+
+    def test_missing_shapefile(self):
+        missing = os.path.join(self.tmp_folder, "missing.shp")
+
+        for endpoint in [SHAPEFILE_ENDPOINT, POINT_SHAPEFILE_ENDPOINT]:
+            resp = self._post(endpoint, missing, {})
+            self.assertEqual(404, resp.status_code)
+            self.assertEqual(
+                f"shapefile {missing} does not exist", resp.json()["detail"])
+
+    def test_shapefile_too_large(self):
+        size = os.stat(self.shapefile).st_size
+
+        too_small = {"max-bytes": size - 1}
+        self.assertEqual(
+            413,
+            self._post(SHAPEFILE_ENDPOINT, self.shapefile, too_small)
+            .status_code
+        )
+        self.assertEqual(
+            413,
+            self._post(POINT_SHAPEFILE_ENDPOINT, self.shapefile, too_small)
+            .status_code
+        )
+        self.assertEqual(
+            200,
+            self._post(SHAPEFILE_ENDPOINT, self.shapefile, {"max-bytes": size})
+            .status_code
+        )
+
+    def test_shapefile_too_complex(self):
+        resp = self._post(
+            SHAPEFILE_ENDPOINT, self.shapefile, {"max-vertices": 9})
+
+        self.assertEqual(422, resp.status_code)
+        self.assertEqual(
+            200,
+            self._post(SHAPEFILE_ENDPOINT, self.shapefile, {"max-vertices": 10})
+            .status_code
+        )
+
+    def test_region_vertices_counted(self):
+        # region "a" has 5 of the shapefile's 10 vertices
+        resp = self._post(
+            SHAPEFILE_ENDPOINT, self.shapefile, {"max-vertices": 5}, "a")
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(
+            [h3.geo_to_h3(5.0, 5.0, RESOLUTION)],
+            [row["cell"] for row in resp.json()]
+        )
+        self.assertEqual(
+            422,
+            self._post(
+                SHAPEFILE_ENDPOINT, self.shapefile, {"max-vertices": 4}, "b")
+            .status_code
+        )
+
+    def test_vertex_limit_not_checked_for_cached_cells(self):
+        self.assertEqual(
+            200, self._post(SHAPEFILE_ENDPOINT, self.shapefile, {}).status_code)
+
+        resp = self._post(
+            SHAPEFILE_ENDPOINT, self.shapefile, {"max-vertices": 1})
+
+        self.assertEqual(200, resp.status_code)
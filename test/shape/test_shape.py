@@ -0,0 +1,195 @@
+# Copyright 2024 Broda Group Software Inc.
+#
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import geopandas
+import numpy as np
+import shapely
+from shapely import Point, box
+
+from geomesh import Geomesh
+from shape import Shape
+
+
+class TestShape(unittest.TestCase):
+    tmp_folder = "./test/test_data/shape/tmp"
+
+    def setUp(self) -> None:
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+        os.makedirs(self.tmp_folder)
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.tmp_folder):
+            shutil.rmtree(self.tmp_folder)
+
+    def _write_shapefile(self, names, geometries) -> str:
+        path = os.path.join(self.tmp_folder, "test.shp")
+        gdf = geopandas.GeoDataFrame(
+            {"name": names}, geometry=geometries, crs="EPSG:4326")
+        gdf.to_file(path)
+        return path
+
+    def _circle_shapefile(self) -> str:
+        # a circle with many vertices, none of which lie on the
+        #  H3_COORDINATE_DECIMALS grid
+        circle = Point(10.123456789, 20.987654321).buffer(5, quad_segs=180)
+        return self._write_shapefile(["circle"], [circle])
+
+    def _circle_shape(self) -> Shape:
+        return Shape(self._circle_shapefile())
+
+    @staticmethod
+    def _num_vertices(shp: Shape) -> int:
+        return int(shapely.get_num_coordinates(
+            shp.gdf["geometry"].values.to_numpy()).sum())
+
+    @staticmethod
+    def _on_grid(shp: Shape, decimals: int) -> bool:
+        coords = shapely.get_coordinates(shp.gdf["geometry"].values.to_numpy())
+        scaled = coords * 10 ** decimals
+        return bool(np.all(np.abs(scaled - np.round(scaled)) < 1e-6))
+
+    def _regions_shape(self) -> Shape:
+        names = ["a", "antarctic", "edge", "b"]
+        geometries = [
+            box(0, 0, 10, 10),
+            box(0, -80, 10, -70),
+            # just below the minimum latitude used by the tests
+            box(20, -61, 30, -60.5),
+            box(40, 0, 50, 10)
+        ]
+        return Shape(self._write_shapefile(names, geometries))
+
+    @staticmethod
+    def _names(gdf) -> list:
+        return gdf["name"].tolist()
+
+    def test_filter_lat_long_prunes_outside_bounds(self):
+        shp = self._regions_shape()
+
+        filtered = shp._filter_lat_long(shp.gdf, -180, 180, -60, 85)
+
+        self.assertEqual(["a", "b"], self._names(filtered))
+
+    def test_filter_lat_long_applies_every_bound(self):
+        shp = self._regions_shape()
+
+        self.assertEqual(
+            ["a", "b"],
+            self._names(shp._filter_lat_long(shp.gdf, min_latitude=-60)))
+        self.assertEqual(
+            ["antarctic", "edge"],
+            self._names(shp._filter_lat_long(shp.gdf, max_latitude=-20)))
+        self.assertEqual(
+            ["a", "antarctic"],
+            self._names(shp._filter_lat_long(shp.gdf, max_longitude=15)))
+        self.assertEqual(
+            ["b"],
+            self._names(shp._filter_lat_long(shp.gdf, min_longitude=35)))
+
+    def test_filter_lat_long_keeps_geometries_within_buffer(self):
+        shp = self._regions_shape()
+
+        filtered = shp._filter_lat_long(shp.gdf, -180, 180, -60, 85, buffer=1)
+
+        self.assertEqual(["a", "edge", "b"], self._names(filtered))
+
+    def test_filter_lat_long_without_bounds(self):
+        shp = self._regions_shape()
+
+        filtered = shp._filter_lat_long(shp.gdf)
+
+        self.assertEqual(["a", "antarctic", "edge", "b"], self._names(filtered))
+
+    def test_filter_lat_long_invalid_bounds(self):
+        shp = self._regions_shape()
+
+        self.assertRaises(
+            ValueError, shp._filter_lat_long, shp.gdf, min_latitude=-91)
+        self.assertRaises(
+            ValueError, shp._filter_lat_long, shp.gdf, max_longitude=181)
+
+    def test_get_h3_in_shape_region_and_bounds(self):
+        shp = self._regions_shape()
+
+        region_cells = shp.get_h3_in_shape(
+            0.5, 2, True, "a", -180, 180, -60, 85)
+        unbounded_region_cells = shp.get_h3_in_shape(0.5, 2, True, "a")
+        all_cells = shp.get_h3_in_shape(0.5, 2, True, None, -180, 180, -60, 85)
+        b_cells = shp.get_h3_in_shape(0.5, 2, True, "b")
+
+        self.assertGreater(len(region_cells), 0)
+        self.assertEqual(unbounded_region_cells, region_cells)
+        self.assertTrue(region_cells < all_cells)
+        self.assertTrue(b_cells < all_cells)
+        self.assertEqual(set(), region_cells & b_cells)
+
+    def test_get_h3_in_shape_region_outside_bounds(self):
+        shp = self._regions_shape()
+
+        self.assertEqual(
+            set(),
+            shp.get_h3_in_shape(0.5, 2, True, "antarctic", -180, 180, -60, 85)
+        )
+        self.assertGreater(
+            len(shp.get_h3_in_shape(0.5, 2, True, "antarctic")), 0)
+
+    def test_simplify_for_h3_reduces_vertices(self):
+        shp = self._circle_shape()
+        original_vertices = self._num_vertices(shp)
+        original = shp.gdf.geometry.iloc[0]
+
+        shp.simplify_for_h3(0.1)
+
+        self.assertLess(self._num_vertices(shp), original_vertices)
+        # no point moves further than the tolerance plus the snapping grid
+        self.assertLessEqual(
+            original.hausdorff_distance(shp.gdf.geometry.iloc[0]), 0.1 + 1e-5)
+        self.assertTrue(self._on_grid(shp, 5))
+
+    def test_simplify_for_h3_zero_tolerance_only_snaps(self):
+        shp = self._circle_shape()
+        original_vertices = self._num_vertices(shp)
+        self.assertFalse(self._on_grid(shp, 5))
+
+        with mock.patch.object(
+                Shape, "_simplify_geometries") as simplify_geometries:
+            shp.simplify_for_h3(0)
+
+        simplify_geometries.assert_not_called()
+        self.assertEqual(original_vertices, self._num_vertices(shp))
+        self.assertTrue(self._on_grid(shp, 5))
+
+    def test_simplify_for_h3_decimals(self):
+        shp = self._circle_shape()
+
+        shp.simplify_for_h3(0, decimals=2)
+
+        self.assertTrue(self._on_grid(shp, 2))
+
+    def test_simplify_for_h3_negative_tolerance(self):
+        shp = self._circle_shape()
+        self.assertRaises(ValueError, shp.simplify_for_h3, -1)
+
+    def test_filter_simplifies_with_tolerance(self):
+        path = self._circle_shapefile()
+        geo = Geomesh(None)
+
+        with mock.patch.object(
+                Shape, "simplify_for_h3",
+                autospec=True,
+                side_effect=Shape.simplify_for_h3) as simplify_for_h3:
+            default_cells = geo.filter(path, resolution=2)
+            unsimplified_cells = geo.filter(path, resolution=2, tolerance=0)
+
+        self.assertEqual(0.1, simplify_for_h3.call_args_list[0].args[1])
+        self.assertEqual(0, simplify_for_h3.call_args_list[1].args[1])
+        self.assertGreater(len(default_cells), 0)
+        self.assertGreater(len(unsimplified_cells), 0)